@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Union
+
+# Bump when the shape of cached results changes
+CACHE_VERSION = 1
+
+# Shared by every service on the host unless OCR_CACHE_DIR says otherwise
+DEFAULT_ROOT = os.environ.get(
+    "OCR_CACHE_DIR",
+    os.path.abspath(
+        os.path.join(os.path.dirname(__file__), "..", "..", ".cache", "ocr")
+    ),
+)
+
+
+def image_hash(image: Union[bytes, str, Any]) -> str:
+    """
+    sha256 of an image: encoded bytes, a file (hashed in chunks from disk) or a
+    C-contiguous array of decoded pixels (shape and dtype included).
+    """
+    hasher = hashlib.sha256()
+    if isinstance(image, str):
+        with open(image, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                hasher.update(chunk)
+    elif isinstance(image, (bytes, bytearray, memoryview)):
+        hasher.update(image)
+    else:
+        hasher.update(f"{image.shape}:{image.dtype}:".encode())
+        hasher.update(memoryview(image))
+    return hasher.hexdigest()
+
+
+def cache_key(image_hash: str, **config: Any) -> str:
+    """
+    Key of one OCR result: the image plus everything that changes the output
+    (engine, psm/oem, preprocessing, min_confidence, ...).
+    """
+    payload = json.dumps(
+        {"version": CACHE_VERSION, "image": image_hash, **config},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class OcrCache:
+    """
+    On-disk cache of OCR results with size-bounded LRU eviction.
+
+    Entries are JSON files under <root>/<key[:2]>/<key>.json, written atomically,
+    so several services (and processes) can share one root. Each process keeps
+    its own LRU index, built from file mtimes on start.
+    """
+
+    def __init__(self, root: str = DEFAULT_ROOT, max_bytes: int = 512 * 1024**2):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # path -> size, LRU first
+        self._total_bytes = 0
+        os.makedirs(self.root, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Return the cached result, marking it most recently used.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+                size = os.fstat(f.fileno()).st_size
+        except (OSError, ValueError):
+            with self._lock:
+                self._forget(path)
+            return None
+        with self._lock:
+            if path not in self._entries:
+                # Written by another process sharing the root
+                self._entries[path] = size
+                self._total_bytes += size
+            self._entries.move_to_end(path)
+        try:
+            os.utime(path)  # keep LRU order across restarts and processes
+        except OSError:
+            pass
+        return value
+
+    def put(self, key: str, value: Dict) -> None:
+        """
+        Store a result and evict least recently used entries until the cache
+        fits in max_bytes.
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        size = os.path.getsize(path)
+        with self._lock:
+            self._forget(path)
+            self._entries[path] = size
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                evicted, evicted_size = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+                try:
+                    os.remove(evicted)
+                except OSError:
+                    pass
+
+    def _forget(self, path: str) -> None:
+        size = self._entries.pop(path, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def _load_index(self) -> None:
+        entries = []
+        for prefix in os.listdir(self.root):
+            prefix_dir = os.path.join(self.root, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for name in os.listdir(prefix_dir):
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(prefix_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(entries):
+            self._entries[path] = size
+            self._total_bytes += size
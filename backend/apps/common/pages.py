@@ -0,0 +1,40 @@
+from typing import List
+
+
+def parse_page_ranges(spec: str, total_pages: int) -> List[int]:
+    """
+    Parse a page selection such as "1-3,7,10-" into 1-based page numbers
+
+    Args:
+        spec: Comma separated page numbers and ranges. Open ranges ("10-")
+              run to the last page.
+        total_pages: Number of pages in the document
+
+    Returns:
+        Page numbers in the order given, without duplicates
+    """
+    page_numbers = []
+    seen = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if "-" in part:
+                start, end = part.split("-", 1)
+                first = int(start) if start.strip() else 1
+                last = int(end) if end.strip() else total_pages
+            else:
+                first = last = int(part)
+        except ValueError:
+            raise ValueError(f"Invalid page range '{part}'")
+
+        if first < 1 or last > total_pages or first > last:
+            raise ValueError(
+                f"Page range '{part}' is out of bounds. PDF has {total_pages} pages."
+            )
+        for page in range(first, last + 1):
+            if page not in seen:
+                seen.add(page)
+                page_numbers.append(page)
+    return page_numbers
@@ -0,0 +1,112 @@
+import hashlib
+import mmap
+import os
+import tempfile
+from typing import Optional, Union
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+# Bytes read from the upload per await; only this much is ever held in memory
+CHUNK_SIZE = 1024 * 1024
+
+
+class SpooledUpload:
+    """
+    An uploaded file spooled to a temporary file on disk.
+
+    Downstream code gets the file path (PyMuPDF, PIL and OpenCV all read files
+    directly) or a read-only memory map instead of a copy of the whole upload.
+    content_hash is the sha256 of the content, computed while spooling.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        filename: str,
+        content_type: Optional[str],
+        size: int,
+        content_hash: str,
+    ):
+        self.path = path
+        self.filename = filename
+        self.content_type = content_type
+        self.size = size
+        self.content_hash = content_hash
+        self._file = None
+        self._map = None
+
+    def buffer(self) -> Union[mmap.mmap, bytes]:
+        """
+        Read-only memory map of the spooled file, opened on first use.
+        """
+        if self.size == 0:
+            return b""  # empty files cannot be mapped
+        if self._map is None:
+            self._file = open(self.path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def close(self) -> None:
+        """
+        Release the memory map and delete the spooled file.
+        """
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                pass  # still exported to an array; unmapped once that is collected
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def __enter__(self) -> "SpooledUpload":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _write_chunk(spool, hasher, chunk: bytes) -> None:
+    hasher.update(chunk)
+    spool.write(chunk)
+
+
+async def spool_upload(
+    file: UploadFile, chunk_size: int = CHUNK_SIZE, spool_dir: Optional[str] = None
+) -> SpooledUpload:
+    """
+    Stream an upload to a temporary file in chunks, hashing it on the way.
+
+    Hashing and writing run in the threadpool so a large upload does not
+    block the event loop. The file keeps the upload's extension so that tools
+    which sniff the type from the name still work. The caller owns the result
+    and must close() it.
+    """
+    suffix = os.path.splitext(file.filename or "")[1]
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=spool_dir)
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as spool:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                await run_in_threadpool(_write_chunk, spool, hasher, chunk)
+                size += len(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return SpooledUpload(
+        path=path,
+        filename=file.filename,
+        content_type=file.content_type,
+        size=size,
+        content_hash=hasher.hexdigest(),
+    )
@@ -1,11 +1,12 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 
 class Line(BaseModel):
     start: List[float]  # [x, y]
     end: List[float]  # [x, y]
     length: Optional[float] = None
+    page: Optional[int] = None
 
 
 class TextElement(BaseModel):
@@ -13,10 +14,21 @@ class TextElement(BaseModel):
     position: List[float]  # [x, y]
     font_size: Optional[float] = None
     bbox: Optional[List[float]] = None  # [x, y, width, height]
+    page: Optional[int] = None
 
 
 class PathElement(BaseModel):
     points: List[List[float]]  # [[x1, y1], [x2, y2], ...]
+    closed: Optional[bool] = False
+    page: Optional[int] = None
+
+
+class HatchRegion(BaseModel):
+    bbox: List[float]  # [x, y, width, height]
+    angle: float  # degrees
+    spacing: float
+    line_count: int
+    page: Optional[int] = None
 
 
 class ScaleInfo(BaseModel):
@@ -36,6 +48,8 @@ class VectorizedPDFResponse(BaseModel):
     paths: List[PathElement]
     scales: List[PageScaleInfo]
     fallback: Optional[bool] = False
+    hatches: List[HatchRegion] = []
+    compaction: Optional[Dict[str, int]] = None  # before/after geometry counts
 
 
 class BoundingBox(BaseModel):
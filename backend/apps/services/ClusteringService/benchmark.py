@@ -0,0 +1,94 @@
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.cluster import AgglomerativeClustering
+
+# OcrService holds the 'models' package that clustering imports
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+OCRSERVICE_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "OcrService"))
+if OCRSERVICE_DIR not in sys.path:
+    sys.path.insert(0, OCRSERVICE_DIR)
+
+from models.models import BoundingBox, OCRTextItem
+from clustering import cluster_ocr_items, item_centers
+
+SIZES = [1_000, 10_000, 100_000]
+DISTANCE_THRESHOLD = 100
+ITEMS_PER_MEGAPIXEL = 60  # roughly a dense architectural sheet at 300 dpi
+SKLEARN_MAX_ITEMS = 10_000  # the reference takes tens of seconds beyond this
+
+
+def synthetic_sheet(n_items, seed=0):
+    """
+    Words laid out in short lines inside randomly placed text blocks, on a
+    sheet sized so the word density stays the same for every n_items.
+    """
+    rng = np.random.default_rng(seed)
+    side = int(np.sqrt(n_items / ITEMS_PER_MEGAPIXEL * 1e6))
+    items = []
+    while len(items) < n_items:
+        block_x, block_y = rng.integers(0, side, size=2)
+        for line in range(rng.integers(1, 6)):
+            x = block_x
+            for _ in range(rng.integers(1, 8)):
+                width = int(rng.integers(20, 120))
+                items.append(
+                    OCRTextItem(
+                        text="W",
+                        bounding_box=BoundingBox(
+                            x=int(x), y=int(block_y + line * 40), width=width, height=24
+                        ),
+                        confidence=90.0,
+                    )
+                )
+                x += width + rng.integers(10, 40)
+    return items[:n_items]
+
+
+def cluster_ocr_items_sklearn(ocr_items, distance_threshold=DISTANCE_THRESHOLD):
+    """
+    The previous AgglomerativeClustering implementation, kept as the reference.
+    """
+    labels = (
+        AgglomerativeClustering(
+            n_clusters=None, distance_threshold=distance_threshold, linkage="single"
+        )
+        .fit(item_centers(ocr_items))
+        .labels_
+    )
+    clusters = {}
+    for label, item in zip(labels, ocr_items):
+        clusters.setdefault(label, []).append(item)
+    return list(clusters.values())
+
+
+def partition(clusters):
+    return [[id(item) for item in cluster] for cluster in clusters]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    print(f"{'items':>8} {'clusters':>9} {'kd-tree s':>10} {'sklearn s':>10}  same")
+    for n_items in SIZES:
+        items = synthetic_sheet(n_items)
+        clusters, fast_seconds = timed(cluster_ocr_items, items, DISTANCE_THRESHOLD)
+        row = f"{n_items:>8} {len(clusters):>9} {fast_seconds:>10.3f}"
+        if n_items > SKLEARN_MAX_ITEMS:
+            print(f"{row} {'skipped':>10}")
+            continue
+        reference, sklearn_seconds = timed(
+            cluster_ocr_items_sklearn, items, DISTANCE_THRESHOLD
+        )
+        same = partition(clusters) == partition(reference)
+        print(f"{row} {sklearn_seconds:>10.3f}  {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,236 @@
-from sklearn.cluster import AgglomerativeClustering
+import hashlib
+import threading
+from collections import OrderedDict
+
 import numpy as np
-from typing import List
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components, minimum_spanning_tree
+from scipy.spatial import Delaunay, QhullError, cKDTree
+from typing import List, Sequence
 
 from models.models import OCRTextItem
 
 
-def cluster_ocr_items(ocr_items: List[OCRTextItem], distance_threshold=100):
+def item_centers(ocr_items: List[OCRTextItem]) -> np.ndarray:
     """
-    Cluster OCR items spatially by their bounding box centers.
-    distance_threshold: max pixels to consider items in same cluster.
+    Bounding box centers of OCR items as an (n, 2) float array.
     """
-    if not ocr_items:
-        return []
-
-    # Compute centers of bounding boxes
-    centers = np.array(
+    return np.array(
         [
             [
                 item.bounding_box.x + item.bounding_box.width / 2,
                 item.bounding_box.y + item.bounding_box.height / 2,
             ]
             for item in ocr_items
-        ]
+        ],
+        dtype=np.float64,
+    ).reshape(-1, 2)
+
+
+def first_appearance_labels(labels: np.ndarray) -> np.ndarray:
+    """
+    Renumber cluster labels 0, 1, 2... in order of each cluster's first item.
+    Labels must already be 0..k-1 (sklearn and scipy both number that way).
+    """
+    if len(labels) == 0:
+        return np.empty(0, dtype=np.intp)
+    n_labels = int(labels.max()) + 1
+    first = np.full(n_labels, len(labels), dtype=np.intp)
+    np.minimum.at(first, labels, np.arange(len(labels)))
+    rank = np.empty(n_labels, dtype=np.intp)
+    rank[np.argsort(first, kind="stable")] = np.arange(n_labels)
+    return rank[labels]
+
+
+def single_linkage_labels(centers: np.ndarray, distance_threshold: float) -> np.ndarray:
+    """
+    Single linkage clustering cut at distance_threshold.
+
+    Two points end up in the same cluster when a chain of points joins them
+    with every hop shorter than distance_threshold, so the clusters are the
+    connected components of the radius graph. Neighbour pairs come from a
+    KD-tree, which keeps this near O(n log n) instead of the O(n^2) of a full
+    agglomerative fit. Hops of exactly distance_threshold do not join, as in
+    sklearn's AgglomerativeClustering, and labels are numbered by first
+    appearance.
+    """
+    n = len(centers)
+    if n == 0:
+        return np.empty(0, dtype=np.intp)
+
+    pairs = cKDTree(centers).query_pairs(distance_threshold, output_type="ndarray")
+    if len(pairs):
+        # query_pairs is inclusive; single linkage only merges below the threshold
+        deltas = centers[pairs[:, 0]] - centers[pairs[:, 1]]
+        pairs = pairs[np.sqrt((deltas**2).sum(axis=1)) < distance_threshold]
+
+    graph = coo_matrix(
+        (np.ones(len(pairs), dtype=np.int8), (pairs[:, 0], pairs[:, 1])), shape=(n, n)
+    )
+    _, labels = connected_components(graph, directed=False)
+    return first_appearance_labels(labels)
+
+
+def _distances(centers: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    deltas = centers[edges[:, 0]] - centers[edges[:, 1]]
+    return np.sqrt((deltas**2).sum(axis=1))
+
+
+def _candidate_edges(centers: np.ndarray):
+    """
+    Edges of the Delaunay triangulation of the distinct centers, which
+    contains a Euclidean minimum spanning tree, and zero length edges tying
+    duplicate centers to their first copy. When the points are collinear there
+    is no triangulation and neighbours along the line are used instead.
+
+    Returns:
+        (triangulation edges, duplicate edges), both (m, 2) index arrays
+    """
+    unique, first, inverse = np.unique(
+        centers, axis=0, return_index=True, return_inverse=True
     )
+    inverse = inverse.reshape(-1)
+    duplicates = np.flatnonzero(first[inverse] != np.arange(len(centers)))
+    duplicate_edges = np.column_stack([first[inverse[duplicates]], duplicates])
+
+    edges = np.empty((0, 2), dtype=np.intp)
+    if len(unique) >= 3:
+        try:
+            simplices = Delaunay(unique).simplices
+            triangle_edges = np.concatenate(
+                [simplices[:, [0, 1]], simplices[:, [1, 2]], simplices[:, [2, 0]]]
+            )
+            edges = first[np.unique(np.sort(triangle_edges, axis=1), axis=0)]
+        except QhullError:
+            # np.unique sorted the points lexicographically, i.e. along the line
+            edges = np.column_stack([first[:-1], first[1:]])
+    elif len(unique) == 2:
+        edges = first[None, :]
+    return edges.astype(np.intp), duplicate_edges.astype(np.intp)
+
+
+class SingleLinkageHierarchy:
+    """
+    Single linkage hierarchy of OCR item centers, built once and cut at any
+    distance threshold.
+
+    The minimum spanning tree holds the whole hierarchy: the single linkage
+    clusters at a threshold are the components left after dropping every tree
+    edge of that length or more. The tree is built in O(n log n) from the
+    Delaunay triangulation, and each cut is a linear pass over its n - 1
+    edges. The labels match single_linkage_labels for every threshold.
+    """
 
-    clustering = AgglomerativeClustering(
-        n_clusters=None, distance_threshold=distance_threshold, linkage="single"
-    ).fit(centers)
+    def __init__(self, centers: np.ndarray):
+        self.n = len(centers)
+        if self.n == 0:
+            self.edges = np.empty((0, 2), dtype=np.intp)
+            self.weights = np.empty(0)
+            return
 
+        edges, duplicate_edges = _candidate_edges(centers)
+        # Distinct centers are never at distance 0, so no edge is lost to the
+        # sparse matrix treating zeros as missing
+        tree = minimum_spanning_tree(
+            coo_matrix(
+                (_distances(centers, edges), (edges[:, 0], edges[:, 1])),
+                shape=(self.n, self.n),
+            )
+        ).tocoo()
+        order = np.argsort(tree.data, kind="stable")
+        self.edges = np.concatenate(
+            [duplicate_edges, np.column_stack([tree.row, tree.col])[order]]
+        ).astype(np.intp)
+        self.weights = np.concatenate([np.zeros(len(duplicate_edges)), tree.data[order]])
+
+    @classmethod
+    def from_items(cls, ocr_items: List[OCRTextItem]) -> "SingleLinkageHierarchy":
+        return cls(item_centers(ocr_items))
+
+    def labels(self, distance_threshold: float) -> np.ndarray:
+        """
+        Cluster labels at distance_threshold, numbered by first appearance.
+        """
+        if self.n == 0:
+            return np.empty(0, dtype=np.intp)
+        kept = self.edges[self.weights < distance_threshold]
+        graph = coo_matrix(
+            (np.ones(len(kept), dtype=np.int8), (kept[:, 0], kept[:, 1])),
+            shape=(self.n, self.n),
+        )
+        _, labels = connected_components(graph, directed=False)
+        return first_appearance_labels(labels)
+
+    def clusters(self, ocr_items: List[OCRTextItem], distance_threshold: float):
+        return group_by_label(ocr_items, self.labels(distance_threshold))
+
+
+# Hierarchies of recently clustered pages, keyed by a hash of their centers
+HIERARCHY_CACHE_SIZE = 32
+_hierarchies: "OrderedDict[str, SingleLinkageHierarchy]" = OrderedDict()
+_hierarchies_lock = threading.Lock()
+
+
+def hierarchy_for(ocr_items: List[OCRTextItem]) -> SingleLinkageHierarchy:
+    """
+    The page's SingleLinkageHierarchy, built on first use and cached.
+    Pages with the same item centers share an entry.
+    """
+    centers = item_centers(ocr_items)
+    key = hashlib.sha256(centers.tobytes()).hexdigest()
+    with _hierarchies_lock:
+        hierarchy = _hierarchies.get(key)
+        if hierarchy is not None:
+            _hierarchies.move_to_end(key)
+            return hierarchy
+
+    hierarchy = SingleLinkageHierarchy(centers)
+    with _hierarchies_lock:
+        _hierarchies[key] = hierarchy
+        while len(_hierarchies) > HIERARCHY_CACHE_SIZE:
+            _hierarchies.popitem(last=False)
+    return hierarchy
+
+
+def group_by_label(ocr_items: List[OCRTextItem], labels: np.ndarray):
     clusters = {}
-    for label, item in zip(clustering.labels_, ocr_items):
+    for label, item in zip(labels, ocr_items):
         clusters.setdefault(label, []).append(item)
-
     return list(clusters.values())
 
 
+def cluster_ocr_items(ocr_items: List[OCRTextItem], distance_threshold=100):
+    """
+    Cluster OCR items spatially by their bounding box centers.
+    distance_threshold: max pixels to consider items in same cluster.
+    """
+    if not ocr_items:
+        return []
+
+    labels = single_linkage_labels(item_centers(ocr_items), distance_threshold)
+    return group_by_label(ocr_items, labels)
+
+
+def cluster_ocr_items_multi(
+    ocr_items: List[OCRTextItem], distance_thresholds: Sequence[float]
+):
+    """
+    cluster_ocr_items for several thresholds at once, e.g. while tuning the
+    threshold for a sheet type. The page's hierarchy is cached, so calling
+    again for the same items only pays for the cuts.
+
+    Returns:
+        one list of clusters per threshold, in the order given
+    """
+    if not ocr_items:
+        return [[] for _ in distance_thresholds]
+
+    hierarchy = hierarchy_for(ocr_items)
+    return [
+        hierarchy.clusters(ocr_items, threshold) for threshold in distance_thresholds
+    ]
+
+
 def merge_cluster_text(cluster):
     # Sort by left x
     sorted_items = sorted(cluster, key=lambda item: item.bounding_box.x)
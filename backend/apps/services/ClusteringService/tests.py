@@ -2,16 +2,16 @@ import os
 import sys
 import json
 
-# Add backend (for 'apps') and backend/apps (for 'services') to sys.path
+# Add backend (for 'apps') and OcrService (for its 'services' and 'models') to sys.path
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-BACKEND_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", ".."))
-APPS_DIR = os.path.abspath(os.path.join(BASE_DIR, ".."))
+BACKEND_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "..", ".."))
+OCRSERVICE_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "OcrService"))
 if BACKEND_DIR not in sys.path:
     sys.path.insert(0, BACKEND_DIR)
-if APPS_DIR not in sys.path:
-    sys.path.insert(0, APPS_DIR)
+if OCRSERVICE_DIR not in sys.path:
+    sys.path.insert(0, OCRSERVICE_DIR)
 
-from services.OcrService.services.ocr_service import OcrService
+from services.ocr_service import OcrService
 from clustering import cluster_by_line, merge_cluster_text
 
 
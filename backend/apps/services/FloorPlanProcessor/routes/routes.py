@@ -2,6 +2,7 @@ from fastapi import APIRouter, File, UploadFile, HTTPException, Form
 from typing import Optional
 import numpy as np
 import cv2
+from apps.common.uploads import spool_upload
 from services.processor import FloorPlanProcessor
 from models.models import FloorPlanProcessorResponse
 import json
@@ -15,9 +16,10 @@ async def process_floorplan(
     ocr_json: str = Form(...),
     scale: Optional[float] = Form(None),
 ):
+    upload = await spool_upload(file)
     try:
-        image_bytes = await file.read()
-        npimg = np.frombuffer(image_bytes, np.uint8)
+        # Decode straight from the memory-mapped upload, no intermediate copy
+        npimg = np.frombuffer(upload.buffer(), np.uint8)
         img = cv2.imdecode(npimg, cv2.IMREAD_COLOR)
         ocr_results = json.loads(ocr_json)
         processor = FloorPlanProcessor(scale=scale)
@@ -25,3 +27,5 @@ async def process_floorplan(
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+    finally:
+        upload.close()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import Dict, List, Optional
 
 
 class BoundingBox(BaseModel):
@@ -13,7 +13,22 @@ class OCRTextItem(BaseModel):
     text: str
     bounding_box: BoundingBox
     confidence: float
+    orientation: int = 0  # degrees counterclockwise of the baseline, 90 = bottom-up
 
 
 class OCRResponse(BaseModel):
     results: List[OCRTextItem]
+    processing_time: Optional[Dict[str, float]] = None  # seconds per stage
+    ocr_area_fraction: Optional[float] = None  # share of the page area OCR'd
+    cache_hit: bool = False
+
+
+class OCRPageResponse(OCRResponse):
+    """
+    OCR result for one image, or one page of a PDF, in a batch request.
+    """
+
+    filename: str
+    page_number: Optional[int] = None  # 1-based, PDF pages only
+    elapsed_seconds: float
+    error: Optional[str] = None
@@ -1,24 +1,125 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException
+from fastapi import APIRouter, File, Form, Request, UploadFile, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+from typing import List, Optional
+from apps.common.uploads import spool_upload
+from services.ocr_columns import encode_result, negotiate_media_type
 from services.ocr_service import OcrService
 from models.models import OCRResponse
 
 router = APIRouter()
 ocr_service = OcrService()
 
+IMAGE_CONTENT_TYPES = [
+    "image/jpeg",
+    "image/png",
+    "image/jpg",
+    "image/bmp",
+    "image/tiff",
+]
+
 
 @router.post("/ocr", response_model=OCRResponse)
-async def ocr_image(file: UploadFile = File(...)):
-    if file.content_type not in [
-        "image/jpeg",
-        "image/png",
-        "image/jpg",
-        "image/bmp",
-        "image/tiff",
-    ]:
+async def ocr_image(
+    request: Request,
+    file: UploadFile = File(...),
+    cascade: Optional[bool] = Form(None),
+    text_regions: Optional[bool] = Form(None),
+    orientation: Optional[bool] = Form(None),
+):
+    """
+    OCR one image. JSON by default; send Accept: application/msgpack or
+    application/vnd.apache.arrow.stream for a columnar binary response.
+    cascade=true re-OCRs low-confidence words in a second, slower pass.
+    text_regions=true only OCRs regions that look like text.
+    orientation=true re-reads rotated text regions upright.
+    """
+    media_type = negotiate_media_type(request.headers.get("accept"))
+    if media_type is None:
+        raise HTTPException(
+            status_code=406, detail="Requested response format is not available."
+        )
+    if file.content_type not in IMAGE_CONTENT_TYPES:
         raise HTTPException(status_code=400, detail="File must be an image.")
+    upload = await spool_upload(file)
     try:
-        image_bytes = await file.read()
-        result = ocr_service.process_image(image_bytes)
-        return result
+        result = await run_in_threadpool(
+            ocr_service.process_image_columns,
+            upload.path,
+            text_regions=text_regions,
+            content_hash=upload.content_hash,
+            cascade=cascade,
+            orientation=orientation,
+        )
+        return Response(
+            content=encode_result(result, media_type),
+            media_type=media_type,
+            headers={"Vary": "Accept"},
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"OCR failed: {str(e)}")
+    finally:
+        upload.close()
+
+
+@router.post("/ocr/batch")
+async def ocr_batch(
+    files: List[UploadFile] = File(...),
+    pages: Optional[str] = Form(None),
+    dpi: int = Form(300),
+    min_confidence: float = Form(60.0),
+    cascade: Optional[bool] = Form(None),
+    text_regions: Optional[bool] = Form(None),
+    orientation: Optional[bool] = Form(None),
+):
+    """
+    OCR many images, or PDFs (rendered at dpi, optionally limited to pages such
+    as "1-3,7"), on the service's worker pool.
+
+    The response is NDJSON: one OCRPageResponse line per image or PDF page, in
+    the order they finish.
+    """
+    for file in files:
+        is_pdf = file.filename.lower().endswith(".pdf")
+        if not is_pdf and file.content_type not in IMAGE_CONTENT_TYPES:
+            raise HTTPException(
+                status_code=400, detail=f"{file.filename}: must be an image or PDF."
+            )
+    if not 36 <= dpi <= 600:
+        raise HTTPException(status_code=400, detail="dpi must be between 36 and 600")
+
+    uploads = []
+    try:
+        for file in files:
+            uploads.append(await spool_upload(file))
+        try:
+            items = await run_in_threadpool(
+                ocr_service.plan_batch,
+                [(file.filename, upload.path) for file, upload in zip(files, uploads)],
+                pages,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        def close_uploads():
+            for upload in uploads:
+                upload.close()
+
+        lines = (
+            page.to_json() + "\n"
+            for page in ocr_service.process_batch(
+                items, min_confidence, dpi, cascade, text_regions, orientation
+            )
+        )
+        response = StreamingResponse(
+            lines,
+            media_type="application/x-ndjson",
+            # The spooled files must outlive the stream
+            background=BackgroundTask(close_uploads),
+        )
+        uploads = []
+        return response
+    finally:
+        for upload in uploads:
+            upload.close()
@@ -0,0 +1,73 @@
+from typing import Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from services.ocr_columns import OcrColumns
+from services.tiling import Box
+
+# Second pass settings
+CASCADE_FLOOR = 10.0  # words below this are linework noise, not worth a retry
+CASCADE_SCALE = 2.0  # crops are upscaled this much before re-OCR
+CASCADE_PSMS = (7, 8)  # single text line, then single word
+CASCADE_PADDING = 6  # pixels of context around the word, before upscaling
+CASCADE_MARGIN = 10  # white border added around the upscaled crop
+
+
+def reocr_word(
+    engine,
+    image: np.ndarray,
+    box: Box,
+    psms: Sequence[int] = CASCADE_PSMS,
+    scale: float = CASCADE_SCALE,
+) -> Optional[Tuple[OcrColumns, float]]:
+    """
+    Re-OCR one word's crop, upscaled and with a white margin, trying each psm.
+
+    Returns:
+        (words found, in page coordinates; their mean confidence) for the best
+        psm, or None if nothing was read
+    """
+    height, width = image.shape[:2]
+    x0 = max(0, box[0] - CASCADE_PADDING)
+    y0 = max(0, box[1] - CASCADE_PADDING)
+    x1 = min(width, box[2] + CASCADE_PADDING)
+    y1 = min(height, box[3] + CASCADE_PADDING)
+    if x1 <= x0 or y1 <= y0:
+        return None
+
+    crop = cv2.resize(
+        image[y0:y1, x0:x1], None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC
+    )
+    # Cubic interpolation greys the edges of a binary image; snap back to b/w
+    cv2.threshold(crop, 127, 255, cv2.THRESH_BINARY, dst=crop)
+    crop = cv2.copyMakeBorder(
+        crop,
+        CASCADE_MARGIN,
+        CASCADE_MARGIN,
+        CASCADE_MARGIN,
+        CASCADE_MARGIN,
+        cv2.BORDER_CONSTANT,
+        value=255,
+    )
+
+    best = None
+    for psm in psms:
+        words = OcrColumns.from_tesseract(engine.image_to_data(crop, psm=psm), 0.0)
+        if not len(words):
+            continue
+        confidence = float(words.confidence.mean())
+        if best is None or confidence > best[1]:
+            best = (words, confidence)
+    if best is None:
+        return None
+
+    words = best[0]
+    # Boxes reaching into the white margin are clipped to the crop
+    words.x = np.maximum((words.x - CASCADE_MARGIN) / scale + x0, x0)
+    words.x = words.x.round().astype(np.int32)
+    words.y = np.maximum((words.y - CASCADE_MARGIN) / scale + y0, y0)
+    words.y = words.y.round().astype(np.int32)
+    words.width = (words.width / scale).round().astype(np.int32)
+    words.height = (words.height / scale).round().astype(np.int32)
+    return words, best[1]
@@ -0,0 +1,253 @@
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models.models import BoundingBox, OCRResponse, OCRTextItem
+
+try:
+    import msgpack
+except ImportError:  # optional, only needed for msgpack responses
+    msgpack = None
+
+try:
+    import pyarrow
+except ImportError:  # optional, only needed for Arrow responses
+    pyarrow = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+# Column name -> dtype of the numeric columns, in output order
+NUMERIC_COLUMNS = {
+    "x": np.int32,
+    "y": np.int32,
+    "width": np.int32,
+    "height": np.int32,
+    "confidence": np.float64,
+    "orientation": np.int16,  # degrees counterclockwise, 0 for horizontal text
+}
+
+
+@dataclass
+class OcrColumns:
+    """
+    Words as parallel arrays instead of one object per word. This is what the
+    service works with internally; per-word models are only built for callers
+    of process_image.
+    """
+
+    text: List[str]
+    x: np.ndarray
+    y: np.ndarray
+    width: np.ndarray
+    height: np.ndarray
+    confidence: np.ndarray
+    orientation: np.ndarray
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Sequence]) -> "OcrColumns":
+        return cls(
+            text=list(data["text"]),
+            **{
+                name: np.asarray(data[name], dtype=dtype)
+                for name, dtype in NUMERIC_COLUMNS.items()
+            },
+        )
+
+    @classmethod
+    def empty(cls) -> "OcrColumns":
+        return cls.from_dict({"text": [], **{name: [] for name in NUMERIC_COLUMNS}})
+
+    @classmethod
+    def from_tesseract(
+        cls,
+        ocr_data: Dict[str, List],
+        min_confidence: float,
+        offset: Tuple[int, int] = (0, 0),
+    ) -> "OcrColumns":
+        """
+        Words from pytesseract-style image_to_data output with text and at least
+        min_confidence, shifted by offset (x, y).
+        """
+        text = [t.strip() for t in ocr_data["text"]]
+        confidence = np.asarray(ocr_data["conf"], dtype=np.float64)
+        keep = np.flatnonzero(
+            (confidence >= min_confidence) & np.array([bool(t) for t in text], bool)
+        )
+        return cls(
+            text=[text[i] for i in keep],
+            x=np.asarray(ocr_data["left"], dtype=np.int32)[keep] + offset[0],
+            y=np.asarray(ocr_data["top"], dtype=np.int32)[keep] + offset[1],
+            width=np.asarray(ocr_data["width"], dtype=np.int32)[keep],
+            height=np.asarray(ocr_data["height"], dtype=np.int32)[keep],
+            confidence=confidence[keep],
+            orientation=np.zeros(len(keep), dtype=np.int16),
+        )
+
+    @classmethod
+    def concat(cls, parts: Sequence["OcrColumns"]) -> "OcrColumns":
+        if not parts:
+            return cls.empty()
+        return cls(
+            text=[t for part in parts for t in part.text],
+            **{
+                name: np.concatenate([getattr(part, name) for part in parts])
+                for name in NUMERIC_COLUMNS
+            },
+        )
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def take(self, indices: Sequence[int]) -> "OcrColumns":
+        indices = np.asarray(indices, dtype=np.intp)
+        return OcrColumns(
+            text=[self.text[i] for i in indices],
+            **{name: getattr(self, name)[indices] for name in NUMERIC_COLUMNS},
+        )
+
+    def boxes(self) -> np.ndarray:
+        """
+        (n, 4) array of x0, y0, x1, y1.
+        """
+        return np.stack(
+            [self.x, self.y, self.x + self.width, self.y + self.height], axis=1
+        )
+
+    def to_dict(self) -> Dict[str, list]:
+        return {
+            "text": list(self.text),
+            **{name: getattr(self, name).tolist() for name in NUMERIC_COLUMNS},
+        }
+
+    def rows(self):
+        """
+        (text, x, y, width, height, confidence, orientation) per word, as
+        Python scalars.
+        """
+        columns = self.to_dict()
+        return zip(columns["text"], *(columns[name] for name in NUMERIC_COLUMNS))
+
+    def to_items(self) -> List[OCRTextItem]:
+        return [
+            OCRTextItem(
+                text=text,
+                bounding_box=BoundingBox(x=x, y=y, width=w, height=h),
+                confidence=conf,
+                orientation=orientation,
+            )
+            for text, x, y, w, h, conf, orientation in self.rows()
+        ]
+
+
+@dataclass
+class OcrResult:
+    """
+    OCR output for one image: columnar words plus the response metadata.
+    extra holds additional top-level fields (batch pages: filename, ...).
+    """
+
+    columns: OcrColumns
+    processing_time: Optional[Dict[str, float]] = None
+    ocr_area_fraction: Optional[float] = None
+    cache_hit: bool = False
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    def _metadata(self) -> Dict[str, Any]:
+        return {
+            "processing_time": self.processing_time,
+            "ocr_area_fraction": self.ocr_area_fraction,
+            "cache_hit": self.cache_hit,
+            **self.extra,
+        }
+
+    def to_response(self) -> OCRResponse:
+        return OCRResponse(
+            results=self.columns.to_items(),
+            processing_time=self.processing_time,
+            ocr_area_fraction=self.ocr_area_fraction,
+            cache_hit=self.cache_hit,
+        )
+
+    def to_json(self) -> str:
+        """
+        Same document as OCRResponse (plus extra), written straight from the
+        columns without building a model per word.
+        """
+        results = [
+            {
+                "text": text,
+                "bounding_box": {"x": x, "y": y, "width": w, "height": h},
+                "confidence": conf,
+                "orientation": orientation,
+            }
+            for text, x, y, w, h, conf, orientation in self.columns.rows()
+        ]
+        return json.dumps(
+            {"results": results, **self._metadata()},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+
+    def to_msgpack(self) -> bytes:
+        """
+        Columnar msgpack map: one array per column plus the metadata fields.
+        """
+        if msgpack is None:
+            raise RuntimeError("msgpack is not installed")
+        return msgpack.packb({**self.columns.to_dict(), **self._metadata()})
+
+    def to_arrow(self) -> bytes:
+        """
+        Arrow IPC stream with one record batch (text, x, y, width, height,
+        confidence, orientation); metadata fields are JSON in the schema
+        metadata.
+        """
+        if pyarrow is None:
+            raise RuntimeError("pyarrow is not installed")
+        batch = pyarrow.RecordBatch.from_arrays(
+            [pyarrow.array(self.columns.text, pyarrow.string())]
+            + [pyarrow.array(getattr(self.columns, name)) for name in NUMERIC_COLUMNS],
+            names=["text", *NUMERIC_COLUMNS],
+        )
+        schema = batch.schema.with_metadata(
+            {key: json.dumps(value) for key, value in self._metadata().items()}
+        )
+        sink = pyarrow.BufferOutputStream()
+        with pyarrow.ipc.new_stream(sink, schema) as writer:
+            writer.write_batch(batch.replace_schema_metadata(schema.metadata))
+        return sink.getvalue().to_pybytes()
+
+
+def negotiate_media_type(accept: Optional[str]) -> Optional[str]:
+    """
+    Pick the response format from an Accept header, in the client's order.
+    JSON is the default; None means only unavailable formats were accepted.
+    """
+    if not accept:
+        return JSON_MEDIA_TYPE
+    unavailable = False
+    for part in accept.split(","):
+        media_type = part.split(";")[0].strip().lower()
+        if media_type in MSGPACK_MEDIA_TYPES:
+            if msgpack is not None:
+                return MSGPACK_MEDIA_TYPES[0]
+            unavailable = True
+        elif media_type == ARROW_MEDIA_TYPE:
+            if pyarrow is not None:
+                return ARROW_MEDIA_TYPE
+            unavailable = True
+        elif media_type in (JSON_MEDIA_TYPE, "application/*", "*/*"):
+            return JSON_MEDIA_TYPE
+    return None if unavailable else JSON_MEDIA_TYPE
+
+
+def encode_result(result: OcrResult, media_type: str) -> bytes:
+    if media_type == ARROW_MEDIA_TYPE:
+        return result.to_arrow()
+    if media_type in MSGPACK_MEDIA_TYPES:
+        return result.to_msgpack()
+    return result.to_json().encode("utf-8")
@@ -0,0 +1,184 @@
+import logging
+import os
+import queue
+import re
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+import pytesseract
+from PIL import Image
+
+try:
+    import tesserocr
+except ImportError:  # optional, falls back to the pytesseract CLI wrapper
+    tesserocr = None
+
+logger = logging.getLogger(__name__)
+
+# Same settings as the original pytesseract call
+TESSERACT_CONFIG = r"--oem 3 --psm 6"
+TESSERACT_LANG = "eng"
+
+# Columns of Tesseract's TSV output, as returned by pytesseract.image_to_data
+TSV_COLUMNS = (
+    "level",
+    "page_num",
+    "block_num",
+    "par_num",
+    "line_num",
+    "word_num",
+    "left",
+    "top",
+    "width",
+    "height",
+    "conf",
+    "text",
+)
+
+
+def _config_value(config: str, option: str, default: int) -> int:
+    match = re.search(rf"--{option}\s+(\d+)", config)
+    return int(match.group(1)) if match else default
+
+
+def parse_tsv(tsv: str) -> Dict[str, List]:
+    """
+    Parse Tesseract TSV rows (without header) into the same dict of columns
+    that pytesseract.image_to_data returns with Output.DICT.
+    """
+    data: Dict[str, List] = {column: [] for column in TSV_COLUMNS}
+    for row in tsv.splitlines():
+        values = row.split("\t")
+        if len(values) < len(TSV_COLUMNS) - 1 or values[0] == "level":
+            continue
+        values += [""] * (len(TSV_COLUMNS) - len(values))
+        for column, value in zip(TSV_COLUMNS, values):
+            if column == "text":
+                data[column].append(value)
+            elif column == "conf":
+                data[column].append(float(value))
+            else:
+                data[column].append(int(value))
+    return data
+
+
+class PytesseractEngine:
+    """
+    Runs the tesseract CLI per call through pytesseract. Used when tesserocr
+    is not installed.
+    """
+
+    name = "pytesseract"
+
+    def __init__(
+        self,
+        config: str = TESSERACT_CONFIG,
+        lang: str = TESSERACT_LANG,
+        pool_size: Optional[int] = None,
+    ):
+        self.config = config
+        self.lang = lang
+        self.pool_size = pool_size or os.cpu_count() or 1
+        # At most pool_size tesseract processes at once, like the handle pool
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+
+    def image_to_data(
+        self, image: np.ndarray, psm: Optional[int] = None
+    ) -> Dict[str, List]:
+        config = self.config
+        if psm is not None:
+            config = re.sub(r"--psm\s+\d+", "", config) + f" --psm {psm}"
+        with self._slots:
+            return pytesseract.image_to_data(
+                Image.fromarray(image),
+                lang=self.lang,
+                output_type=pytesseract.Output.DICT,
+                config=config,
+            )
+
+
+class TesserocrEngine:
+    """
+    Pool of long-lived Tesseract API handles (tesserocr), so the traineddata is
+    loaded once per handle instead of once per call and images are passed as
+    raw buffers instead of temp files.
+
+    Each handle serves one call at a time. tesserocr releases the GIL while
+    recognizing, so up to pool_size calls run in parallel on threads.
+    Output has the same shape as pytesseract.image_to_data.
+    """
+
+    name = "tesserocr"
+
+    def __init__(
+        self,
+        config: str = TESSERACT_CONFIG,
+        lang: str = TESSERACT_LANG,
+        pool_size: Optional[int] = None,
+    ):
+        if tesserocr is None:
+            raise RuntimeError("tesserocr is not installed")
+        self.config = config
+        self.lang = lang
+        self.oem = _config_value(config, "oem", 3)
+        self.psm = _config_value(config, "psm", 3)
+        self.pool_size = pool_size or os.cpu_count() or 1
+        self._handles: "queue.LifoQueue" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        # Handles are created on demand, up to pool_size
+        with self._lock:
+            if self._handles.empty() and self._created < self.pool_size:
+                self._created += 1
+                return tesserocr.PyTessBaseAPI(
+                    lang=self.lang, psm=self.psm, oem=self.oem
+                )
+        return self._handles.get()
+
+    def image_to_data(
+        self, image: np.ndarray, psm: Optional[int] = None
+    ) -> Dict[str, List]:
+        image = np.ascontiguousarray(image, dtype=np.uint8)
+        height, width = image.shape[:2]
+        bytes_per_pixel = 1 if image.ndim == 2 else image.shape[2]
+
+        api = self._acquire()
+        try:
+            if psm is not None:
+                api.SetPageSegMode(psm)
+            api.SetImageBytes(
+                image.tobytes(), width, height, bytes_per_pixel, width * bytes_per_pixel
+            )
+            tsv = api.GetTSVText(0) or ""
+        finally:
+            api.Clear()
+            if psm is not None:
+                api.SetPageSegMode(self.psm)
+            self._handles.put(api)
+        return parse_tsv(tsv)
+
+    def close(self) -> None:
+        while not self._handles.empty():
+            self._handles.get().End()
+
+
+def create_engine(
+    config: str = TESSERACT_CONFIG,
+    lang: str = TESSERACT_LANG,
+    pool_size: Optional[int] = None,
+):
+    """
+    The persistent tesserocr engine if available, else pytesseract, which
+    starts a tesseract process per call and logs a warning saying so.
+    """
+    if tesserocr is not None:
+        return TesserocrEngine(config=config, lang=lang, pool_size=pool_size)
+    logger.warning(
+        "tesserocr is not installed, falling back to pytesseract: every OCR call "
+        "starts a tesseract process. Install tesserocr (needs libtesseract-dev "
+        "and libleptonica-dev) to keep persistent API handles."
+    )
+    return PytesseractEngine(config=config, lang=lang, pool_size=pool_size)
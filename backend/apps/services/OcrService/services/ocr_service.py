@@ -1,68 +1,514 @@
-import pytesseract
 from PIL import Image
 import io
+import os
+import threading
+import time
 import cv2
+import fitz  # PyMuPDF
 import numpy as np
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
-from models.models import OCRResponse, OCRTextItem, BoundingBox
+from apps.common.ocr_cache import OcrCache, cache_key, image_hash
+from apps.common.pages import parse_page_ranges
+from models.models import OCRResponse, OCRTextItem
+from services.ocr_columns import OcrColumns, OcrResult
+from services.cascade import CASCADE_FLOOR, CASCADE_PSMS, CASCADE_SCALE, reocr_word
+from services.ocr_engine import create_engine
+from services.orientation import estimate_orientation, map_boxes, rotate_region
+from services.preprocessing import (
+    DEFAULT_STAGES,
+    MEDIAN_KSIZE,
+    THRESHOLD_BLOCK_SIZE,
+    THRESHOLD_C,
+    decode_gray,
+    preprocess,
+)
+from services.text_regions import FULL_PAGE_FRACTION, propose_text_regions
+from services.tiling import (
+    TILE_OVERLAP,
+    TILE_SIZE,
+    Box,
+    dedupe_words,
+    tile_grid,
+    touches_inner_edge,
+)
+
+# Resolution PDF pages are rendered at for OCR
+PDF_DPI = 300
+
+# (filename, path, 0-based page index or None for an image)
+BatchItem = Tuple[str, str, Optional[int]]
+
+
+def render_pdf_page(page: fitz.Page, dpi: int = PDF_DPI) -> np.ndarray:
+    # Rendered straight to gray; the one copy is owned by the caller
+    pixmap = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+    gray = np.frombuffer(pixmap.samples_mv, dtype=np.uint8)
+    return gray.reshape(pixmap.height, pixmap.width).copy()
 
 
 class OcrService:
-    def __init__(self):
-        pass  # No initialization needed for pytesseract
+    def __init__(
+        self,
+        engine=None,
+        max_workers: Optional[int] = None,
+        tile_size: int = TILE_SIZE,
+        tile_overlap: int = TILE_OVERLAP,
+        preprocess_stages: Sequence[str] = DEFAULT_STAGES,
+        text_regions: bool = False,
+        cascade: bool = False,
+        orientation: bool = False,
+        cache: Optional[OcrCache] = None,
+        use_cache: bool = True,
+    ):
+        # Persistent tesserocr handles when installed, pytesseract otherwise
+        self.engine = engine or create_engine(pool_size=max_workers)
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        self.preprocess_stages = tuple(preprocess_stages)
+        self.text_regions = text_regions
+        self.cascade = cascade
+        self.orientation = orientation
+        # Shared with the other services through the on-disk OCR cache
+        self.cache = (cache or OcrCache()) if use_cache else None
+        # Both engines release the GIL while recognizing, so threads are enough
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="ocr-tile"
+        )
+        # Separate pool so batch pages never wait on their own tiles
+        self._batch_executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="ocr-batch"
+        )
 
     def preprocess_image(self, image: Image.Image) -> Image.Image:
         """
         Convert the image to grayscale and apply adaptive thresholding to improve OCR accuracy.
         """
-        img = np.array(image)
-        gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
-        thresh = cv2.adaptiveThreshold(
-            gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, 11, 8
-        )
-        blur = cv2.medianBlur(thresh, 3)
-        return Image.fromarray(blur)
+        gray = np.array(image.convert("L"))
+        return Image.fromarray(preprocess(gray, self.preprocess_stages)[0])
 
     def process_image(
-        self, image_bytes: bytes, min_confidence: float = 60.0
+        self,
+        image: Union[bytes, str, np.ndarray],
+        min_confidence: float = 60.0,
+        stages: Optional[Sequence[str]] = None,
+        text_regions: Optional[bool] = None,
+        content_hash: Optional[str] = None,
+        cascade: Optional[bool] = None,
+        orientation: Optional[bool] = None,
     ) -> OCRResponse:
         """
-        Perform OCR on a given image byte stream, returning bounding boxes and text with confidence filtering.
+        Perform OCR on a given image byte stream (or image file path, or RGB/gray array), returning bounding boxes and text with confidence filtering.
+
+        See process_image_columns for the options; this builds one model per
+        word for callers that want objects.
         """
-        image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-        preprocessed_image = self.preprocess_image(image)
+        return self.process_image_columns(
+            image,
+            min_confidence,
+            stages=stages,
+            text_regions=text_regions,
+            content_hash=content_hash,
+            cascade=cascade,
+            orientation=orientation,
+        ).to_response()
+
+    def process_image_columns(
+        self,
+        image: Union[bytes, str, np.ndarray],
+        min_confidence: float = 60.0,
+        stages: Optional[Sequence[str]] = None,
+        text_regions: Optional[bool] = None,
+        content_hash: Optional[str] = None,
+        cascade: Optional[bool] = None,
+        orientation: Optional[bool] = None,
+    ) -> OcrResult:
+        """
+        OCR an image into columnar words (parallel arrays, no per-word objects).
+
+        The image is decoded straight to grayscale and preprocessed in place
+        (a gray array passed in is modified). stages overrides the service's
+        preprocessing stages; thresholding is skipped for binary input.
+        processing_time reports seconds per stage.
+
+        With text_regions (default: the service setting, off unless enabled)
+        only regions that look like text are OCR'd, in parallel;
+        ocr_area_fraction is the share of the page they cover. Words outside
+        the regions are not read. Dense pages are OCR'd whole.
+
+        With cascade (default: the service setting) words below min_confidence
+        from the first pass are re-OCR'd from upscaled crops with single-line
+        and single-word psm, and the more confident reading is kept, so text
+        that was dropped before can be recovered.
 
-        custom_config = r"--oem 3 --psm 6"
-        ocr_data = pytesseract.image_to_data(
-            preprocessed_image,
-            output_type=pytesseract.Output.DICT,
-            config=custom_config,
+        With orientation (default: the service setting, off unless enabled)
+        each proposed text region gets a cheap direction estimate; only rotated regions are
+        rotated upright and OCR'd again, and each word reports its orientation.
+
+        Results are cached on disk by image content and OCR settings;
+        content_hash (sha256 of the image bytes) skips hashing a known upload.
+        """
+        start = time.perf_counter()
+        stages = self.preprocess_stages if stages is None else tuple(stages)
+        if text_regions is None:
+            text_regions = self.text_regions
+        if cascade is None:
+            cascade = self.cascade
+        if orientation is None:
+            orientation = self.orientation
+
+        key = None
+        if self.cache is not None:
+            key = cache_key(
+                content_hash or image_hash(image),
+                **self._cache_config(
+                    min_confidence, stages, text_regions, cascade, orientation
+                ),
+            )
+            cached = self.cache.get(key)
+            if cached is not None:
+                elapsed = time.perf_counter() - start
+                timings = {"cache_seconds": elapsed, "total_seconds": elapsed}
+                return OcrResult(
+                    columns=OcrColumns.from_dict(cached["columns"]),
+                    processing_time=timings,
+                    ocr_area_fraction=cached["ocr_area_fraction"],
+                    cache_hit=True,
+                )
+
+        gray = decode_gray(image)
+        timings = {"decode_seconds": time.perf_counter() - start}
+
+        preprocessed, stage_timings = preprocess(gray, stages)
+        timings.update(stage_timings)
+
+        height, width = preprocessed.shape[:2]
+        regions: List[Box] = [(0, 0, width, height)]
+        area_fraction = 1.0
+        proposed: List[Box] = []
+        if text_regions or orientation:
+            proposal_start = time.perf_counter()
+            proposed, fraction = propose_text_regions(preprocessed)
+            timings["text_regions_seconds"] = time.perf_counter() - proposal_start
+            if text_regions and fraction < FULL_PAGE_FRACTION:
+                regions, area_fraction = proposed, fraction
+
+        ocr_start = time.perf_counter()
+        # The cascade needs the low-confidence words the first pass would drop
+        first_pass = min(CASCADE_FLOOR, min_confidence) if cascade else min_confidence
+        columns = self._ocr_regions(preprocessed, regions, first_pass)
+        timings["ocr_seconds"] = time.perf_counter() - ocr_start
+        if orientation and proposed:
+            orientation_start = time.perf_counter()
+            columns, rotated = self._reorient(
+                preprocessed, columns, proposed, min_confidence, first_pass
+            )
+            timings["orientation_seconds"] = time.perf_counter() - orientation_start
+            timings["rotated_regions"] = rotated
+        if cascade:
+            cascade_start = time.perf_counter()
+            columns, retried, recovered = self._cascade(
+                preprocessed, columns, min_confidence
+            )
+            timings["cascade_seconds"] = time.perf_counter() - cascade_start
+            timings["cascade_words"] = retried
+            timings["cascade_recovered"] = recovered
+        timings["total_seconds"] = time.perf_counter() - start
+        result = OcrResult(
+            columns=columns,
+            processing_time=timings,
+            ocr_area_fraction=round(area_fraction, 4),
         )
+        if key is not None:
+            self.cache.put(
+                key,
+                {
+                    "columns": columns.to_dict(),
+                    "ocr_area_fraction": result.ocr_area_fraction,
+                },
+            )
+        return result
+
+    def _cache_config(
+        self,
+        min_confidence: float,
+        stages: Sequence[str],
+        text_regions: bool,
+        cascade: bool,
+        orientation: bool,
+    ) -> Dict:
+        return {
+            "output": "columns.v2",
+            "engine": self.engine.name,
+            "config": self.engine.config,
+            "lang": self.engine.lang,
+            "preprocess": {
+                "stages": list(stages),
+                "threshold": [THRESHOLD_BLOCK_SIZE, THRESHOLD_C],
+                "median_ksize": MEDIAN_KSIZE,
+            },
+            "text_regions": text_regions,
+            "tiles": [self.tile_size, self.tile_overlap],
+            "min_confidence": min_confidence,
+            "cascade": (
+                [CASCADE_FLOOR, CASCADE_SCALE, list(CASCADE_PSMS)] if cascade else None
+            ),
+            "orientation": orientation,
+        }
 
-        ocr_items: List[OCRTextItem] = []
-        n_boxes = len(ocr_data["level"])
-        for i in range(n_boxes):
-            text = ocr_data["text"][i].strip()
-            conf = float(ocr_data["conf"][i])
+    def _reorient(
+        self,
+        preprocessed: np.ndarray,
+        columns: OcrColumns,
+        regions: Sequence[Box],
+        min_confidence: float,
+        first_pass: float,
+    ) -> Tuple[OcrColumns, int]:
+        """
+        Re-read regions whose text is not horizontal. Each rotated region is
+        turned upright both ways (e.g. 90 and 270 degrees) and OCR'd in
+        parallel; the reading with the most confident text replaces the
+        first-pass words inside the region when it beats them.
 
-            if not text or conf < min_confidence:
+        Returns:
+            (words, number of regions replaced by a rotated reading)
+        """
+        rotated: List[Tuple[Box, float]] = []
+        for region in regions:
+            if max(region[2] - region[0], region[3] - region[1]) > self.tile_size:
                 continue
+            angle = estimate_orientation(preprocessed, region)
+            if angle:
+                rotated.append((region, angle))
+        if not rotated:
+            return columns, 0
 
-            x = int(ocr_data["left"][i])
-            y = int(ocr_data["top"][i])
-            width = int(ocr_data["width"][i])
-            height = int(ocr_data["height"][i])
+        def score(words: OcrColumns) -> float:
+            return float(words.confidence[words.confidence >= min_confidence].sum())
 
-            ocr_items.append(
-                OCRTextItem(
-                    text=text,
-                    bounding_box=BoundingBox(x=x, y=y, width=width, height=height),
-                    confidence=conf,
+        def read(job: Tuple[Box, float]) -> Tuple[OcrColumns, float]:
+            region, angle = job
+            best = None
+            for candidate in (angle, angle + 180):
+                crop, inverse = rotate_region(preprocessed, region, candidate)
+                words = OcrColumns.from_tesseract(
+                    self.engine.image_to_data(crop), first_pass
                 )
+                if best is None or score(words) > score(best[0]):
+                    best = (words, inverse, candidate)
+            words, inverse, candidate = best
+            words.x, words.y, words.width, words.height = map_boxes(
+                inverse, words.x, words.y, words.width, words.height
             )
+            words.orientation[:] = round(candidate) % 360
+            return words, score(words)
+
+        centers_x = columns.x + columns.width / 2
+        centers_y = columns.y + columns.height / 2
+        replaced = np.zeros(len(columns), dtype=bool)
+        parts: List[OcrColumns] = []
+        for (region, _), (words, rotated_score) in zip(
+            rotated, self._executor.map(read, rotated)
+        ):
+            inside = (
+                (centers_x >= region[0])
+                & (centers_x < region[2])
+                & (centers_y >= region[1])
+                & (centers_y < region[3])
+                & ~replaced
+            )
+            if rotated_score > score(columns.take(np.flatnonzero(inside))):
+                replaced |= inside
+                parts.append(words)
+
+        kept = columns.take(np.flatnonzero(~replaced))
+        return OcrColumns.concat([kept, *parts]), len(parts)
+
+    def _cascade(
+        self, preprocessed: np.ndarray, columns: OcrColumns, min_confidence: float
+    ) -> Tuple[OcrColumns, int, int]:
+        """
+        Second pass over words below min_confidence. Each is re-OCR'd from its
+        own crop in parallel; a reading replaces the word when it is more
+        confident. Words still below min_confidence are dropped, like in a
+        single pass.
+
+        Returns:
+            (merged words in first-pass order, words retried, words recovered)
+        """
+        # Rotated words were already read upright; the crops here are horizontal
+        low = np.flatnonzero(
+            (columns.confidence < min_confidence) & (columns.orientation == 0)
+        )
+        boxes = columns.boxes()
+        retries = self._executor.map(
+            lambda i: reocr_word(self.engine, preprocessed, tuple(boxes[i].tolist())),
+            low,
+        )
+
+        parts = [columns]
+        order = [np.arange(len(columns), dtype=np.float64)]
+        replaced = np.zeros(len(columns), dtype=bool)
+        for i, retry in zip(low, retries):
+            if retry is None or retry[1] <= columns.confidence[i]:
+                continue
+            words, _ = retry
+            replaced[i] = True
+            parts.append(words)
+            # Keep the replacement where the original word was
+            order.append(i + np.linspace(0, 0.5, len(words), endpoint=False))
+
+        merged = OcrColumns.concat(parts)
+        position = np.concatenate(order)
+        keep = np.concatenate(
+            [~replaced, np.ones(len(merged) - len(columns), dtype=bool)]
+        ) & (merged.confidence >= min_confidence)
+        kept = np.flatnonzero(keep)
+        kept = kept[np.argsort(position[kept], kind="stable")]
+        recovered = int(np.count_nonzero(keep[len(columns) :]))
+        return merged.take(kept), len(low), recovered
+
+    def _ocr_regions(
+        self, preprocessed: np.ndarray, regions: Sequence[Box], min_confidence: float
+    ) -> OcrColumns:
+        """
+        OCR regions of the page in parallel. Regions larger than tile_size are
+        split into overlapping tiles; words are mapped back to page coordinates
+        and duplicates read on both sides of a seam are dropped.
+        """
+        jobs: List[Tuple[Box, Box]] = []  # (tile, region it belongs to)
+        for region in regions:
+            rx, ry = region[0], region[1]
+            for x0, y0, x1, y1 in tile_grid(
+                region[2] - rx, region[3] - ry, self.tile_size, self.tile_overlap
+            ):
+                jobs.append(((x0 + rx, y0 + ry, x1 + rx, y1 + ry), region))
+
+        def run(job: Tuple[Box, Box]) -> Dict[str, List]:
+            x0, y0, x1, y1 = job[0]
+            return self.engine.image_to_data(preprocessed[y0:y1, x0:x1])
+
+        if not jobs:
+            return OcrColumns.empty()
+        if len(jobs) == 1:
+            return OcrColumns.from_tesseract(run(jobs[0]), min_confidence)
+
+        parts: List[OcrColumns] = []
+        tile_ids: List[int] = []
+        cut: List[bool] = []
+        for tile_id, ((tile, region), ocr_data) in enumerate(
+            zip(jobs, self._executor.map(run, jobs))
+        ):
+            part = OcrColumns.from_tesseract(ocr_data, min_confidence, tile[:2])
+            parts.append(part)
+            tile_ids.extend([tile_id] * len(part))
+            cut.extend(
+                touches_inner_edge(box, tile, region) for box in part.boxes().tolist()
+            )
+
+        columns = OcrColumns.concat(parts)
+        boxes = columns.boxes().tolist()
+        keep = dedupe_words(
+            boxes, columns.text, columns.confidence.tolist(), tile_ids, cut
+        )
+        # Top-to-bottom, left-to-right, like a single Tesseract pass
+        keep.sort(key=lambda i: (boxes[i][1], boxes[i][0]))
+        return columns.take(keep)
+
+    def plan_batch(
+        self, uploads: Sequence[Tuple[str, str]], pages: Optional[str] = None
+    ) -> List[BatchItem]:
+        """
+        Expand a batch of uploaded files into one work item per image or PDF page.
+
+        Args:
+            uploads: (filename, path) of each uploaded file
+            pages: Page selection such as "1-3,7" applied to every PDF (None for all)
+
+        Raises:
+            ValueError: if the page selection does not fit a PDF
+        """
+        items: List[BatchItem] = []
+        for filename, path in uploads:
+            if not filename.lower().endswith(".pdf"):
+                items.append((filename, path, None))
+                continue
+            with fitz.open(path, filetype="pdf") as document:
+                page_count = document.page_count
+            page_numbers = (
+                parse_page_ranges(pages, page_count)
+                if pages
+                else range(1, page_count + 1)
+            )
+            items.extend((filename, path, number - 1) for number in page_numbers)
+        return items
+
+    def process_batch(
+        self,
+        items: Sequence[BatchItem],
+        min_confidence: float = 60.0,
+        dpi: int = PDF_DPI,
+        cascade: Optional[bool] = None,
+        text_regions: Optional[bool] = None,
+        orientation: Optional[bool] = None,
+    ) -> Iterator[OcrResult]:
+        """
+        OCR batch items on the worker pool, yielding each page as soon as it is
+        done (completion order, not input order). A failing page is reported with
+        its error instead of aborting the batch. The OCRPageResponse fields are
+        in each result's extra.
+
+        Each PDF is opened once; pages are rendered one at a time per document
+        while OCR of rendered pages runs in parallel.
+        """
+        start_time = time.time()
+        documents: Dict[str, Tuple[fitz.Document, threading.Lock]] = {}
+        for _, path, page_idx in items:
+            if page_idx is not None and path not in documents:
+                documents[path] = (fitz.open(path, filetype="pdf"), threading.Lock())
+
+        def run(item: BatchItem) -> OcrResult:
+            filename, path, page_idx = item
+            page_number = None if page_idx is None else page_idx + 1
+            error = None
+            try:
+                if page_idx is None:
+                    source = path
+                else:
+                    document, lock = documents[path]
+                    with lock:
+                        source = render_pdf_page(document[page_idx], dpi)
+                result = self.process_image_columns(
+                    source,
+                    min_confidence,
+                    text_regions=text_regions,
+                    cascade=cascade,
+                    orientation=orientation,
+                )
+            except Exception as e:
+                result = OcrResult(columns=OcrColumns.empty())
+                error = str(e)
+            result.extra = {
+                "filename": filename,
+                "page_number": page_number,
+                "elapsed_seconds": time.time() - start_time,
+                "error": error,
+            }
+            return result
 
-        return OCRResponse(results=ocr_items)
+        futures = [self._batch_executor.submit(run, item) for item in items]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            # Client went away or we are done: drop queued pages, then close
+            for future in futures:
+                future.cancel()
+            wait(futures)
+            for document, _ in documents.values():
+                document.close()
 
     def draw_ocr_boxes(
         self,
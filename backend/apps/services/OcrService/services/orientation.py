@@ -0,0 +1,114 @@
+import math
+from typing import Tuple
+
+import cv2
+import numpy as np
+
+from services.text_regions import DOWNSCALE, INK_THRESHOLD
+from services.tiling import Box
+
+# Regions within this many degrees of horizontal are read as they are
+ORIENTATION_TOLERANCE = 10.0
+# Angles this close to vertical are snapped to exactly 90 degrees
+AXIS_SNAP = 3.0
+# Ink spread along the main axis vs across it (std ratio) to trust the angle;
+# round blobs such as single glyphs or square tags are left alone
+MIN_ELONGATION = 2.0
+ROTATION_MARGIN = 10  # white border around the rotated crop
+
+
+def estimate_orientation(
+    binary: np.ndarray, box: Box, downscale: int = DOWNSCALE
+) -> float:
+    """
+    Text direction of a region, in degrees counterclockwise from horizontal in
+    [0, 180), or 0.0 if the region reads horizontally or has no clear direction.
+
+    Uses the principal axis of the ink (second-order central moments) of a
+    downscaled crop, so a label costs a few hundred pixels of work. Whether
+    the text runs along the axis or against it (90 vs 270) is not decided
+    here; see rotate_region.
+    """
+    x0, y0, x1, y1 = box
+    crop = binary[y0:y1, x0:x1]
+    small = cv2.resize(
+        crop,
+        (max(1, (x1 - x0) // downscale), max(1, (y1 - y0) // downscale)),
+        interpolation=cv2.INTER_AREA,
+    )
+    ink = (small < INK_THRESHOLD).astype(np.uint8)
+    moments = cv2.moments(ink, binaryImage=True)
+    if moments["m00"] < 3:
+        return 0.0
+
+    mu20, mu02, mu11 = moments["mu20"], moments["mu02"], moments["mu11"]
+    spread = math.sqrt(4 * mu11 * mu11 + (mu20 - mu02) ** 2)
+    major = (mu20 + mu02 + spread) / 2
+    minor = (mu20 + mu02 - spread) / 2
+    if minor > 0 and major < MIN_ELONGATION**2 * minor:
+        return 0.0
+
+    # Image y points down, so negate to get counterclockwise degrees
+    angle = -math.degrees(0.5 * math.atan2(2 * mu11, mu20 - mu02)) % 180
+    if min(angle, 180 - angle) < ORIENTATION_TOLERANCE:
+        return 0.0
+    if abs(angle - 90) < AXIS_SNAP:
+        return 90.0
+    return angle
+
+
+def rotate_region(
+    binary: np.ndarray, box: Box, angle: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Crop a region and rotate it clockwise by angle so text at that
+    orientation reads horizontally.
+
+    Returns:
+        (rotated crop on a white canvas, 2x3 affine mapping rotated crop
+        pixels back to page pixels)
+    """
+    x0, y0, x1, y1 = box
+    crop = binary[y0:y1, x0:x1]
+    height, width = crop.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), -angle, 1.0)
+    cos, sin = abs(matrix[0, 0]), abs(matrix[0, 1])
+    out_width = int(height * sin + width * cos) + 2 * ROTATION_MARGIN
+    out_height = int(height * cos + width * sin) + 2 * ROTATION_MARGIN
+    matrix[0, 2] += out_width / 2 - width / 2
+    matrix[1, 2] += out_height / 2 - height / 2
+    rotated = cv2.warpAffine(
+        crop,
+        matrix,
+        (out_width, out_height),
+        flags=cv2.INTER_NEAREST,
+        borderMode=cv2.BORDER_CONSTANT,
+        borderValue=255,
+    )
+    inverse = cv2.invertAffineTransform(matrix)
+    inverse[:, 2] += (x0, y0)
+    return rotated, inverse
+
+
+def map_boxes(
+    inverse: np.ndarray,
+    x: np.ndarray,
+    y: np.ndarray,
+    width: np.ndarray,
+    height: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Axis-aligned page boxes around word boxes read from a rotated crop.
+    """
+    xs = np.stack([x, x + width, x, x + width], axis=1).astype(np.float64)
+    ys = np.stack([y, y, y + height, y + height], axis=1).astype(np.float64)
+    page_x = inverse[0, 0] * xs + inverse[0, 1] * ys + inverse[0, 2]
+    page_y = inverse[1, 0] * xs + inverse[1, 1] * ys + inverse[1, 2]
+    left = np.floor(page_x.min(axis=1))
+    top = np.floor(page_y.min(axis=1))
+    return (
+        left.astype(np.int32),
+        top.astype(np.int32),
+        (np.ceil(page_x.max(axis=1)) - left).astype(np.int32),
+        (np.ceil(page_y.max(axis=1)) - top).astype(np.int32),
+    )
@@ -0,0 +1,88 @@
+import io
+import time
+from typing import Dict, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Stages run in this order; each works in place on the grayscale buffer
+STAGES = ("threshold", "median_blur")
+DEFAULT_STAGES = STAGES
+
+# Same parameters as the original preprocessing
+THRESHOLD_BLOCK_SIZE = 11
+THRESHOLD_C = 8
+MEDIAN_KSIZE = 3
+
+
+def decode_gray(image: Union[bytes, str, np.ndarray]) -> np.ndarray:
+    """
+    Decode an image straight to one 8-bit grayscale buffer.
+
+    Encoded bytes and paths are decoded by OpenCV without an RGB intermediate;
+    formats OpenCV cannot read fall back to PIL. RGB arrays are converted to
+    gray, 2D arrays are used as they are (so later stages modify them).
+    """
+    if isinstance(image, np.ndarray):
+        if image.ndim == 2:
+            return image
+        return cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+
+    if isinstance(image, str):
+        gray = cv2.imread(image, cv2.IMREAD_GRAYSCALE)
+    else:
+        gray = cv2.imdecode(np.frombuffer(image, np.uint8), cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        pil_image = Image.open(image if isinstance(image, str) else io.BytesIO(image))
+        gray = np.array(pil_image.convert("L"))
+    return gray
+
+
+def is_binary(gray: np.ndarray) -> bool:
+    """
+    True if the image only contains pure black and white (e.g. a bilevel render).
+    """
+    hist = cv2.calcHist([gray], [0], None, [256], [0, 256])
+    return not hist[1:255].any()
+
+
+def preprocess(
+    gray: np.ndarray, stages: Sequence[str] = DEFAULT_STAGES
+) -> Tuple[np.ndarray, Dict[str, float]]:
+    """
+    Run the selected stages in place on a grayscale buffer.
+
+    Thresholding is skipped when the input is already binary. A read-only
+    buffer is copied once up front.
+
+    Returns:
+        (preprocessed buffer, seconds per stage as "<stage>_seconds")
+    """
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise ValueError(f"Unknown preprocessing stages: {sorted(unknown)}")
+    if not gray.flags.writeable:
+        gray = gray.copy()
+
+    timings: Dict[str, float] = {}
+    for stage in STAGES:
+        if stage not in stages:
+            continue
+        start = time.perf_counter()
+        if stage == "threshold":
+            if is_binary(gray):
+                continue
+            cv2.adaptiveThreshold(
+                gray,
+                255,
+                cv2.ADAPTIVE_THRESH_MEAN_C,
+                cv2.THRESH_BINARY,
+                THRESHOLD_BLOCK_SIZE,
+                THRESHOLD_C,
+                dst=gray,
+            )
+        elif stage == "median_blur":
+            cv2.medianBlur(gray, MEDIAN_KSIZE, dst=gray)
+        timings[f"{stage}_seconds"] = time.perf_counter() - start
+    return gray, timings
@@ -0,0 +1,108 @@
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+from services.tiling import Box, area
+
+# Defaults, in pixels of the full-resolution (300 dpi) page unless noted
+DOWNSCALE = 4  # proposal runs on an image this many times smaller
+INK_THRESHOLD = 230  # downscaled pixels darker than this contain ink
+MIN_GLYPH_HEIGHT = 6
+MAX_GLYPH_HEIGHT = 150
+MAX_GLYPH_WIDTH = 1200  # a word or short label, not a wall
+MAX_ASPECT = 20.0  # longer, thinner components are lines
+MIN_FILL = 0.08  # ink pixels per bbox pixel; sparse components are linework
+JOIN_X = 28  # glyphs closer than this horizontally join one region
+JOIN_Y = 12  # ... and vertically
+REGION_PADDING = 12
+FULL_PAGE_FRACTION = 0.5  # above this, OCR the whole page instead
+
+
+def _merge_overlapping(boxes: List[Box]) -> List[Box]:
+    merged = list(boxes)
+    changed = True
+    while changed:
+        changed = False
+        result: List[Box] = []
+        for box in merged:
+            for i, other in enumerate(result):
+                if (
+                    box[0] < other[2]
+                    and other[0] < box[2]
+                    and box[1] < other[3]
+                    and other[1] < box[3]
+                ):
+                    result[i] = (
+                        min(box[0], other[0]),
+                        min(box[1], other[1]),
+                        max(box[2], other[2]),
+                        max(box[3], other[3]),
+                    )
+                    changed = True
+                    break
+            else:
+                result.append(box)
+        merged = result
+    return merged
+
+
+def propose_text_regions(
+    binary: np.ndarray, downscale: int = DOWNSCALE
+) -> Tuple[List[Box], float]:
+    """
+    Propose regions of a preprocessed page (dark text on white) that look like
+    text, so OCR can skip empty paper and pure linework.
+
+    Connected components of a downscaled ink mask are kept when their size,
+    aspect ratio and fill look like glyphs or words. Kept components are
+    grown by JOIN_X/JOIN_Y so that neighbouring glyphs join, padded, and
+    merged until no two regions overlap.
+
+    Returns:
+        (non-overlapping regions as x0, y0, x1, y1 in page pixels, fraction of
+        the page area they cover)
+    """
+    height, width = binary.shape[:2]
+    small = cv2.resize(
+        binary,
+        (max(1, width // downscale), max(1, height // downscale)),
+        interpolation=cv2.INTER_AREA,
+    )
+    _, ink = cv2.threshold(small, INK_THRESHOLD, 255, cv2.THRESH_BINARY_INV)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    stats = stats[1:]  # label 0 is the background
+
+    w = stats[:, cv2.CC_STAT_WIDTH]
+    h = stats[:, cv2.CC_STAT_HEIGHT]
+    fill = stats[:, cv2.CC_STAT_AREA] / (w * h)
+    glyph_like = (
+        (h * downscale >= MIN_GLYPH_HEIGHT)
+        & (h * downscale <= MAX_GLYPH_HEIGHT)
+        & (w * downscale <= MAX_GLYPH_WIDTH)
+        & (np.maximum(w, h) <= MAX_ASPECT * np.minimum(w, h))
+        & (fill >= MIN_FILL)
+    )
+
+    glyphs = np.zeros_like(ink)
+    for x, y, cw, ch, _ in stats[glyph_like]:
+        glyphs[y : y + ch, x : x + cw] = 255
+    kernel = np.ones(
+        (max(1, JOIN_Y // downscale), max(1, JOIN_X // downscale)), np.uint8
+    )
+    joined = cv2.dilate(glyphs, kernel)
+    _, _, regions, _ = cv2.connectedComponentsWithStats(joined, connectivity=8)
+
+    boxes = [
+        (
+            max(0, x * downscale - REGION_PADDING),
+            max(0, y * downscale - REGION_PADDING),
+            min(width, (x + rw) * downscale + REGION_PADDING),
+            min(height, (y + rh) * downscale + REGION_PADDING),
+        )
+        for x, y, rw, rh, _ in regions[1:].tolist()
+    ]
+    boxes = _merge_overlapping(boxes)
+    page_area = width * height
+    fraction = sum(area(box) for box in boxes) / page_area if page_area else 0.0
+    return boxes, fraction
@@ -0,0 +1,123 @@
+from typing import List, Sequence, Tuple
+
+Box = Tuple[int, int, int, int]  # x0, y0, x1, y1
+
+# Defaults, in pixels of the (300 dpi) page image
+TILE_SIZE = 2048
+TILE_OVERLAP = 160  # wider than the longest label we expect to read
+IOU_THRESHOLD = 0.5  # same text with at least this IoU is one word
+FRAGMENT_COVERAGE = 0.5  # a seam-cut word this much covered by a whole word is dropped
+EDGE_MARGIN = 2  # a word this close to an inner tile edge is cut by it
+
+
+def _starts(length: int, tile_size: int, overlap: int) -> List[int]:
+    if length <= tile_size:
+        return [0]
+    step = tile_size - overlap
+    starts = list(range(0, length - tile_size, step))
+    starts.append(length - tile_size)
+    return starts
+
+
+def tile_grid(
+    width: int, height: int, tile_size: int = TILE_SIZE, overlap: int = TILE_OVERLAP
+) -> List[Box]:
+    """
+    Overlapping tiles covering the image, row by row. Neighbouring tiles share
+    at least overlap pixels; the last tile of a row/column is flush with the
+    image edge.
+    """
+    if overlap >= tile_size:
+        raise ValueError("overlap must be smaller than tile_size")
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in _starts(height, tile_size, overlap)
+        for x in _starts(width, tile_size, overlap)
+    ]
+
+
+def area(box: Box) -> int:
+    return max(0, box[2] - box[0]) * max(0, box[3] - box[1])
+
+
+def intersection(a: Box, b: Box) -> int:
+    return area((max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3])))
+
+
+def iou(a: Box, b: Box) -> float:
+    inter = intersection(a, b)
+    union = area(a) + area(b) - inter
+    return inter / union if union else 0.0
+
+
+def touches_inner_edge(
+    box: Box, tile: Box, bounds: Box, margin: int = EDGE_MARGIN
+) -> bool:
+    """
+    True if the word box reaches a tile edge that is not also an edge of the
+    tiled area (bounds), i.e. the word may be cut off by the tile.
+    """
+    x0, y0, x1, y1 = tile
+    return (
+        (x0 > bounds[0] and box[0] <= x0 + margin)
+        or (y0 > bounds[1] and box[1] <= y0 + margin)
+        or (x1 < bounds[2] and box[2] >= x1 - margin)
+        or (y1 < bounds[3] and box[3] >= y1 - margin)
+    )
+
+
+def dedupe_words(
+    boxes: Sequence[Box],
+    texts: Sequence[str],
+    confidences: Sequence[float],
+    tile_ids: Sequence[int],
+    cut: Sequence[bool],
+    iou_threshold: float = IOU_THRESHOLD,
+    fragment_coverage: float = FRAGMENT_COVERAGE,
+) -> List[int]:
+    """
+    Indices of the words to keep after merging tile results.
+
+    Only words from different tiles are compared. A word read twice (same
+    text, case-insensitive, IoU >= iou_threshold) keeps its most confident
+    reading. A word cut by a tile edge is dropped when a whole word from
+    another tile covers at least fragment_coverage of it.
+
+    Candidates are bucketed on a coarse grid so only nearby words are compared.
+    """
+    cell = max([max(b[2] - b[0], b[3] - b[1]) for b in boxes] + [1])
+    grid = {}
+    for i, box in enumerate(boxes):
+        for gx in range(box[0] // cell, box[2] // cell + 1):
+            for gy in range(box[1] // cell, box[3] // cell + 1):
+                grid.setdefault((gx, gy), []).append(i)
+
+    dropped = set()
+    order = sorted(range(len(boxes)), key=lambda i: (cut[i], -confidences[i]))
+    for i in order:
+        if i in dropped:
+            continue
+        box = boxes[i]
+        neighbours = {
+            j
+            for gx in range(box[0] // cell, box[2] // cell + 1)
+            for gy in range(box[1] // cell, box[3] // cell + 1)
+            for j in grid[(gx, gy)]
+        }
+        for j in neighbours:
+            if j == i or j in dropped or tile_ids[j] == tile_ids[i]:
+                continue
+            other = boxes[j]
+            if (
+                texts[j].lower() == texts[i].lower()
+                and iou(box, other) >= iou_threshold
+            ):
+                dropped.add(j)
+            elif (
+                cut[j]
+                and not cut[i]
+                and area(other)
+                and intersection(box, other) >= fragment_coverage * area(other)
+            ):
+                dropped.add(j)
+    return [i for i in range(len(boxes)) if i not in dropped]
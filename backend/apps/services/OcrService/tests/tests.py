@@ -4,9 +4,12 @@ import json
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))  # ...\OcrService\tests
 OCRSERVICE_DIR = os.path.abspath(os.path.join(BASE_DIR, ".."))  # ...\OcrService
+BACKEND_DIR = os.path.abspath(os.path.join(OCRSERVICE_DIR, "..", "..", ".."))
 
 if OCRSERVICE_DIR not in sys.path:
     sys.path.insert(0, OCRSERVICE_DIR)
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(1, BACKEND_DIR)  # for the shared 'apps.common' package
 
 from services.ocr_service import OcrService  # Import from services/ocr_service.py
 
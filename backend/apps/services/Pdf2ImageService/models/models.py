@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 
 class BBox(BaseModel):
@@ -23,8 +23,96 @@ class PageResult(BaseModel):
     images: List[str] = []
 
 
+class ImageTile(BaseModel):
+    image_path: str
+    x: int  # offset in page pixels at the rendered dpi
+    y: int
+    width: int
+    height: int
+
+
+class PyramidInfo(BaseModel):
+    content_hash: str
+    page_number: int
+    width: int  # full resolution (level max_level) in pixels
+    height: int
+    dpi: int
+    tile_size: int
+    overlap: int
+    max_level: int  # level 0 is 1x1, each level doubles up to max_level
+    tile_url: str  # relative to the API root, png/jpg/webp extensions all work
+
+
+class PageImageResult(BaseModel):
+    page_number: int
+    image_path: Optional[str] = None  # image file, or tile directory for tiled pages
+    processing_time: Dict[str, float]
+    status: str = "Rendered"
+    dpi: Optional[int] = None
+    colorspace: Optional[str] = None
+    encoding: Optional[str] = None  # png, npy, ppm, webp or bilevel
+    tiles: List[ImageTile] = []
+    page_type: str = "raster"  # "vector" pages are extracted instead of rendered
+    vector_path: Optional[str] = None  # JSON with text spans and drawings
+    classification: Dict[str, Any] = {}
+    pyramid: Optional[PyramidInfo] = None  # deep zoom tiles, with pyramid=true
+
+
 class Pdf2ImageResponse(BaseModel):
     filename: str
     image_paths: List[str]
     processing_time: Dict[str, float]
     status: str
+    pages: List[PageImageResult] = []
+
+
+class PageText(BaseModel):
+    # One entry per text span at the same index in every list, in reading order
+    page_number: int
+    width: float  # page size in PDF points
+    height: float
+    text: List[str] = []
+    bbox: List[List[float]] = []  # [x, y, width, height], origin top-left
+    origin: List[List[float]] = []  # baseline start [x, y]
+    font_size: List[float] = []
+    rotation: List[float] = []  # writing direction, degrees counter-clockwise
+    font: List[str] = []
+
+
+class TextExtractionResponse(BaseModel):
+    filename: str
+    pages: List[PageText]
+    processing_time: Dict[str, float]
+    status: str
+
+
+class RenderOptions(BaseModel):
+    tile_size: Optional[int] = None  # tile edge in pixels, None renders whole pages
+    tile_overlap: int = 64
+    memory_budget_mb: Optional[int] = None  # per request, shared by all workers
+    classify_pages: bool = False  # extract vector pages instead of rendering them
+    encoding: str = "png"  # png, npy, ppm, webp or bilevel (1-bit PNG)
+    png_compress_level: Optional[int] = None  # 0-9, None keeps MuPDF's default
+    pyramid: bool = False  # keep the PDF so deep zoom tiles can be served lazily
+
+
+class JobStatus(BaseModel):
+    job_id: str
+    filename: str
+    status: str = "queued"  # queued, running, completed or failed
+    pages_done: int = 0
+    pages_total: Optional[int] = None  # known once the job has started
+    submitted_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    result: Optional[Pdf2ImageResponse] = None
+
+
+class JobProgress(BaseModel):
+    job_id: str
+    status: str
+    pages_done: int
+    pages_total: Optional[int] = None
+    progress: float  # 0.0 - 1.0
+    queue_position: Optional[int] = None  # jobs ahead of this one, while queued
@@ -1,16 +1,68 @@
 import time
-from fastapi import APIRouter, File, UploadFile, Form, HTTPException
+from functools import partial
+import re
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    UploadFile,
+    Form,
+    HTTPException,
+    Request,
+    Response,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from typing import Optional
 
-from models.models import Pdf2ImageResponse
+from apps.common.uploads import spool_upload
+from models.models import (
+    JobProgress,
+    JobStatus,
+    Pdf2ImageResponse,
+    PyramidInfo,
+    RenderOptions,
+    TextExtractionResponse,
+)
+from services.jobs import JobManager, JobQueueFull
 from services.services import PdfToImageService
+from services.tile_pyramid import TILE_FORMATS
 
 router = APIRouter()
+# Shared instance so the render cache index is kept across requests
+pdf_to_image_service = PdfToImageService()
+job_manager = JobManager()
+
+_TILE_NAME = re.compile(r"(\d+)_(\d+)\.(\w+)$")
+# Tiles are content-addressed (PDF hash, page, dpi, level, position), never stale
+TILE_CACHE_CONTROL = "public, max-age=31536000, immutable"
 
 
 def get_pdf_to_image_service() -> PdfToImageService:
     """Get PDF to Image service instance - this would typically come from dependency injection"""
-    return PdfToImageService()
+    return pdf_to_image_service
+
+
+def render_options(
+    tile_size: Optional[int] = Form(None),
+    tile_overlap: int = Form(64),
+    memory_budget_mb: Optional[int] = Form(None),
+    classify_pages: bool = Form(False),
+    encoding: str = Form("png"),
+    png_compress_level: Optional[int] = Form(None),
+    pyramid: bool = Form(False),
+) -> RenderOptions:
+    """Render settings form fields shared by /process-pdf and /jobs"""
+    return RenderOptions(
+        tile_size=tile_size,
+        tile_overlap=tile_overlap,
+        memory_budget_mb=memory_budget_mb,
+        classify_pages=classify_pages,
+        encoding=encoding,
+        png_compress_level=png_compress_level,
+        pyramid=pyramid,
+    )
 
 
 @router.get("/health")
@@ -44,24 +96,225 @@ async def process_pdf(
     extract_tables: bool = Form(False),
     extract_images: bool = Form(False),
     page_number: Optional[int] = Form(None),
+    pages: Optional[str] = Form(None),
+    priority_pages: Optional[str] = Form(None),
+    stream: bool = Form(False),
+    options: RenderOptions = Depends(render_options),
 ):
-    """Process PDF file and convert to images"""
+    """
+    Process PDF file and convert to images.
+
+    With stream=true the response is NDJSON: one line per page as soon as it is
+    rendered, then a final line with the full Pdf2ImageResponse.
+    With tile_size set, pages are written as overlapping tiles instead of one
+    image. memory_budget_mb caps render buffers for the whole request by
+    switching to grayscale and lowering dpi (or shrinking tiles) as needed.
+    With classify_pages=true, vector pages are extracted to JSON (text spans and
+    drawings) instead of being rendered; only scanned pages become images.
+    encoding picks the page file format (png, npy, ppm, webp, bilevel); raw
+    formats skip compression entirely for consumers on the same host.
+    With pyramid=true each page also gets a deep zoom pyramid, served from
+    /pyramids and rendered tile by tile on first request.
+    """
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="File must be a PDF")
 
+    # Spooled to disk in chunks; render workers open the file by path
+    upload = await spool_upload(file)
     try:
-        file_content = await file.read()
         pdf_to_image_service = get_pdf_to_image_service()
 
+        if stream:
+            # Validation and cache lookups happen up front, off the event loop
+            pages_stream = await run_in_threadpool(
+                pdf_to_image_service.stream_pdf,
+                pdf_source=upload.path,
+                filename=file.filename,
+                page_number=page_number,
+                pages=pages,
+                priority_pages=priority_pages,
+                options=options,
+                content_hash=upload.content_hash,
+            )
+            response = StreamingResponse(
+                pages_stream,
+                media_type="application/x-ndjson",
+                # The spooled file must outlive the stream
+                background=BackgroundTask(upload.close),
+            )
+            upload = None
+            return response
+
         return await pdf_to_image_service.process_pdf(
-            file_content=file_content,
+            pdf_source=upload.path,
             filename=file.filename,
             page_number=page_number,
+            pages=pages,
+            priority_pages=priority_pages,
+            options=options,
+            content_hash=upload.content_hash,
         )
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
+    finally:
+        if upload is not None:
+            upload.close()
+
+
+@router.post("/extract-text", response_model=TextExtractionResponse)
+async def extract_text(
+    file: UploadFile = File(...),
+    pages: Optional[str] = Form(None),
+    stream: bool = Form(False),
+):
+    """
+    Extract text spans with bbox, font size and rotation from the PDF's text
+    layer, as compact per-page arrays. No rendering or OCR is involved.
+
+    With stream=true the response is NDJSON: one line per page as soon as it is
+    extracted, then a final line with the full TextExtractionResponse.
+    """
+    if not file.filename.lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="File must be a PDF")
+
+    upload = await spool_upload(file)
+    try:
+        pdf_to_image_service = get_pdf_to_image_service()
+
+        if stream:
+            pages_stream = await run_in_threadpool(
+                pdf_to_image_service.stream_text,
+                pdf_source=upload.path,
+                filename=file.filename,
+                pages=pages,
+                content_hash=upload.content_hash,
+            )
+            response = StreamingResponse(
+                pages_stream,
+                media_type="application/x-ndjson",
+                background=BackgroundTask(upload.close),
+            )
+            upload = None
+            return response
+
+        return await run_in_threadpool(
+            pdf_to_image_service.extract_text,
+            pdf_source=upload.path,
+            filename=file.filename,
+            pages=pages,
+            content_hash=upload.content_hash,
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error extracting text: {str(e)}")
+    finally:
+        if upload is not None:
+            upload.close()
+
+
+@router.post("/jobs", response_model=JobStatus, status_code=202)
+async def submit_job(
+    file: UploadFile = File(...),
+    page_number: Optional[int] = Form(None),
+    pages: Optional[str] = Form(None),
+    priority_pages: Optional[str] = Form(None),
+    options: RenderOptions = Depends(render_options),
+):
+    """
+    Queue a PDF conversion and return its job id right away.
+
+    Takes the same parameters as /process-pdf. Poll /jobs/{job_id}/progress
+    and fetch the result from /jobs/{job_id}. Returns 429 once the job queue
+    is full.
+    """
+    if not file.filename.lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="File must be a PDF")
+
+    upload = await spool_upload(file)
+    work = partial(
+        get_pdf_to_image_service().convert_pdf,
+        pdf_source=upload.path,
+        filename=file.filename,
+        page_number=page_number,
+        pages=pages,
+        priority_pages=priority_pages,
+        options=options,
+        content_hash=upload.content_hash,
+    )
+    try:
+        return job_manager.submit(file.filename, work, on_done=upload.close)
+    except JobQueueFull as e:
+        upload.close()
+        raise HTTPException(
+            status_code=429, detail=str(e), headers={"Retry-After": "10"}
+        )
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    """Job status, with the full Pdf2ImageResponse once it has completed"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+
+@router.get("/jobs/{job_id}/progress", response_model=JobProgress)
+async def get_job_progress(job_id: str):
+    """Lightweight job progress for polling"""
+    progress = job_manager.progress(job_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return progress
+
+
+@router.get("/pyramids/{content_hash}/{page_number}", response_model=PyramidInfo)
+async def get_pyramid(content_hash: str, page_number: int):
+    """Deep zoom layout of a page processed with pyramid=true"""
+    tile_pyramid = get_pdf_to_image_service().tile_pyramid
+    try:
+        return await run_in_threadpool(tile_pyramid.info, content_hash, page_number)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.get("/pyramids/{content_hash}/{page_number}/{level}/{tile}")
+async def get_pyramid_tile(
+    content_hash: str, page_number: int, level: int, tile: str, request: Request
+):
+    """
+    One deep zoom tile, e.g. /pyramids/<hash>/1/12/3_5.png (col 3, row 5).
+
+    Tiles are rendered on first request and cached after that. Responses carry
+    an ETag and a long-lived Cache-Control; If-None-Match gets a 304.
+    """
+    match = _TILE_NAME.match(tile)
+    if not match or match.group(3) not in TILE_FORMATS:
+        raise HTTPException(status_code=404, detail=f"Tile {tile} not found")
+    col, row, fmt = int(match.group(1)), int(match.group(2)), match.group(3)
+
+    tile_pyramid = get_pdf_to_image_service().tile_pyramid
+    etag = f'"{content_hash[:16]}-{page_number}-{tile_pyramid.dpi}-{level}-{tile}"'
+    headers = {"ETag": etag, "Cache-Control": TILE_CACHE_CONTROL}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    try:
+        path = await run_in_threadpool(
+            tile_pyramid.tile, content_hash, page_number, level, col, row, fmt
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    # The tile stays pinned in the render cache until it has been sent
+    return FileResponse(
+        path,
+        media_type=TILE_FORMATS[fmt],
+        headers=headers,
+        background=BackgroundTask(tile_pyramid.render_cache.release, [path]),
+    )
 
 
 @router.post("/process-image", response_model=Pdf2ImageResponse)
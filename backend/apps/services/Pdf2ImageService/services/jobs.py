@@ -0,0 +1,138 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from fastapi import HTTPException
+
+from models.models import JobProgress, JobStatus, Pdf2ImageResponse
+
+FINISHED = ("completed", "failed")
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the queue is at its limit"""
+
+
+class JobManager:
+    """
+    Runs PDF conversions in the background on a bounded thread pool.
+
+    At most max_running jobs render at once (each one already spreads its pages
+    over a process pool), up to max_queued more wait for a slot and anything
+    beyond that is refused with JobQueueFull. The keep_finished most recent
+    finished jobs stay available for status queries.
+    """
+
+    def __init__(
+        self, max_running: int = 1, max_queued: int = 8, keep_finished: int = 100
+    ):
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.keep_finished = keep_finished
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_running, thread_name_prefix="pdf-job"
+        )
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, JobStatus]" = OrderedDict()  # oldest first
+        self._active = 0  # queued + running
+
+    def submit(
+        self,
+        filename: str,
+        work: Callable[..., Pdf2ImageResponse],
+        on_done: Optional[Callable[[], None]] = None,
+    ) -> JobStatus:
+        """
+        Queue work(progress=callback) and return the new job.
+
+        on_done runs after the job finishes either way, e.g. to remove the
+        spooled upload.
+        """
+        with self._lock:
+            if self._active >= self.max_running + self.max_queued:
+                raise JobQueueFull(
+                    f"Job queue is full ({self._active} jobs queued or running)"
+                )
+            job = JobStatus(
+                job_id=uuid.uuid4().hex, filename=filename, submitted_at=time.time()
+            )
+            self._jobs[job.job_id] = job
+            self._active += 1
+            snapshot = job.model_copy()
+
+        self._executor.submit(self._run, job.job_id, work, on_done)
+        return snapshot
+
+    def get(self, job_id: str) -> Optional[JobStatus]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.model_copy() if job else None
+
+    def progress(self, job_id: str) -> Optional[JobProgress]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            queue_position = None
+            if job.status == "queued":
+                queue_position = sum(
+                    1
+                    for other in self._jobs.values()
+                    if other.status == "queued"
+                    and other.submitted_at < job.submitted_at
+                )
+            if job.status == "completed":
+                progress = 1.0
+            elif job.pages_total:
+                progress = job.pages_done / job.pages_total
+            else:
+                progress = 0.0
+            return JobProgress(
+                job_id=job.job_id,
+                status=job.status,
+                pages_done=job.pages_done,
+                pages_total=job.pages_total,
+                progress=round(progress, 4),
+                queue_position=queue_position,
+            )
+
+    def _update(self, job_id: str, **fields) -> None:
+        with self._lock:
+            job = self._jobs[job_id]
+            for name, value in fields.items():
+                setattr(job, name, value)
+
+    def _run(
+        self,
+        job_id: str,
+        work: Callable[..., Pdf2ImageResponse],
+        on_done: Optional[Callable[[], None]],
+    ) -> None:
+        self._update(job_id, status="running", started_at=time.time())
+
+        def progress(done: int, total: int) -> None:
+            self._update(job_id, pages_done=done, pages_total=total)
+
+        try:
+            result = work(progress=progress)
+            self._update(job_id, status="completed", result=result)
+        except HTTPException as e:
+            self._update(job_id, status="failed", error=str(e.detail))
+        except Exception as e:
+            self._update(job_id, status="failed", error=f"Error processing PDF: {e}")
+        finally:
+            with self._lock:
+                self._jobs[job_id].finished_at = time.time()
+                self._active -= 1
+                self._prune()
+            if on_done:
+                on_done()
+
+    def _prune(self) -> None:
+        # Drop the oldest finished jobs beyond keep_finished
+        finished = [j for j, job in self._jobs.items() if job.status in FINISHED]
+        for job_id in finished[: max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
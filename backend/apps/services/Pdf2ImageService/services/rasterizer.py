@@ -0,0 +1,416 @@
+import json
+import math
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import fitz  # PyMuPDF
+import numpy as np
+from PIL import Image
+
+from utils.pdf_utils import (
+    extract_vector_page,
+    get_pdf_page_sizes,
+    open_pdf,
+    pixmap_to_array,
+)
+
+COLORSPACES = {"rgb": fitz.csRGB, "gray": fitz.csGRAY}
+BYTES_PER_PIXEL = {"rgb": 3, "gray": 1}
+MIN_DPI = 72
+
+# Output encodings for pages and tiles:
+#   png     - PNG, MuPDF's default compression unless a compress level is given
+#   npy     - raw samples as a numpy array, for consumers on the same host
+#   ppm     - raw samples as PPM (PGM for grayscale)
+#   webp    - lossless WebP at its fastest setting
+#   bilevel - 1-bit PNG, line drawings are effectively black and white
+ENCODINGS = ("png", "npy", "ppm", "webp", "bilevel")
+BILEVEL_THRESHOLD = 128  # gray values at or above this become white
+
+_TILE_NAME = re.compile(r"tile_(\d+)_(\d+)_(\d+)x(\d+)\.[\w.]+$")
+
+# Document opened once per worker process by the pool initializer
+_worker_document = None
+
+
+def _init_worker(pdf_source: Union[bytes, str]) -> None:
+    global _worker_document
+    _worker_document = open_pdf(pdf_source)
+
+
+def encoding_ext(encoding: str, colorspace: str) -> str:
+    """
+    File extension of a page or tile saved with the given encoding.
+    """
+    if encoding == "ppm":
+        return "pgm" if colorspace == "gray" else "ppm"
+    if encoding == "bilevel":
+        return "1bit.png"
+    return encoding
+
+
+def _save_pixmap(
+    pixmap: fitz.Pixmap,
+    path: str,
+    encoding: str = "png",
+    compress_level: Optional[int] = None,
+) -> None:
+    """
+    Write a pixmap in the given encoding. The format is never inferred from
+    path since callers write to temp names first.
+    """
+    if encoding == "png" and compress_level is None:
+        pixmap.save(path, output="png")
+    elif encoding == "ppm":
+        pixmap.save(path, output="pnm")
+    elif encoding == "npy":
+        with open(path, "wb") as f:
+            np.save(f, pixmap_to_array(pixmap))
+    elif encoding == "webp":
+        Image.fromarray(pixmap_to_array(pixmap)).save(
+            path, format="WEBP", lossless=True, method=0
+        )
+    elif encoding == "bilevel":
+        # Rendered in gray; a 1-bit PNG compresses fast since there is little to do
+        Image.fromarray(pixmap_to_array(pixmap) >= BILEVEL_THRESHOLD).save(
+            path,
+            format="PNG",
+            compress_level=1 if compress_level is None else compress_level,
+        )
+    else:
+        Image.fromarray(pixmap_to_array(pixmap)).save(
+            path, format="PNG", compress_level=compress_level
+        )
+
+
+def tile_offsets(length: int, tile_size: int, overlap: int) -> List[int]:
+    """
+    Start offsets of tiles along one axis so that consecutive tiles overlap by
+    at least `overlap` pixels and the last tile ends exactly at `length`.
+    """
+    if length <= tile_size:
+        return [0]
+    step = tile_size - overlap
+    offsets = list(range(0, length - tile_size, step))
+    offsets.append(length - tile_size)
+    return offsets
+
+
+def list_tiles(tiles_dir: str) -> List[Dict]:
+    """
+    Read back the tile layout of a tiled page from its file names.
+    """
+    tiles = []
+    for name in os.listdir(tiles_dir):
+        match = _TILE_NAME.match(name)
+        if not match:
+            continue
+        x, y, width, height = (int(v) for v in match.groups())
+        tiles.append(
+            {
+                "image_path": os.path.join(tiles_dir, name),
+                "x": x,
+                "y": y,
+                "width": width,
+                "height": height,
+            }
+        )
+    tiles.sort(key=lambda t: (t["y"], t["x"]))
+    return tiles
+
+
+def _render_full_page(page: fitz.Page, task: Dict) -> Tuple[float, float]:
+    render_start = time.time()
+    pixmap = page.get_pixmap(
+        dpi=task["dpi"], colorspace=COLORSPACES[task["colorspace"]]
+    )
+    render_time = time.time() - render_start
+
+    # Write to a temp file first so readers never see a half-written page
+    encode_start = time.time()
+    image_path = task["image_path"]
+    os.makedirs(os.path.dirname(image_path) or ".", exist_ok=True)
+    tmp_path = f"{image_path}.{os.getpid()}.tmp"
+    _save_pixmap(
+        pixmap, tmp_path, task.get("encoding", "png"), task.get("compress_level")
+    )
+    os.replace(tmp_path, image_path)
+    encode_time = time.time() - encode_start
+    return render_time, encode_time
+
+
+def _render_tiled_page(page: fitz.Page, task: Dict) -> Tuple[float, float]:
+    """
+    Render a page as overlapping fixed-size tiles, holding only one tile in
+    memory at a time. The page content is interpreted once into a display list.
+    """
+    zoom = task["dpi"] / 72
+    matrix = fitz.Matrix(zoom, zoom)
+    colorspace = COLORSPACES[task["colorspace"]]
+    tile_size = task["tile_size"]
+    overlap = task["tile_overlap"]
+    encoding = task.get("encoding", "png")
+    ext = encoding_ext(encoding, task["colorspace"])
+
+    render_start = time.time()
+    display_list = page.get_displaylist()
+    render_time = time.time() - render_start
+    encode_time = 0.0
+
+    width = math.ceil(page.rect.width * zoom)
+    height = math.ceil(page.rect.height * zoom)
+
+    tiles_dir = task["image_path"]
+    tmp_dir = f"{tiles_dir}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    for y in tile_offsets(height, tile_size, overlap):
+        for x in tile_offsets(width, tile_size, overlap):
+            clip = fitz.Rect(
+                page.rect.x0 + x / zoom,
+                page.rect.y0 + y / zoom,
+                page.rect.x0 + min(x + tile_size, width) / zoom,
+                page.rect.y0 + min(y + tile_size, height) / zoom,
+            )
+            render_start = time.time()
+            pixmap = display_list.get_pixmap(
+                matrix=matrix, colorspace=colorspace, alpha=False, clip=clip
+            )
+            render_time += time.time() - render_start
+
+            # Pixmap origin and size are exact after MuPDF rounds the clip
+            encode_start = time.time()
+            _save_pixmap(
+                pixmap,
+                os.path.join(
+                    tmp_dir,
+                    f"tile_{pixmap.x}_{pixmap.y}_{pixmap.width}x{pixmap.height}.{ext}",
+                ),
+                encoding,
+                task.get("compress_level"),
+            )
+            encode_time += time.time() - encode_start
+            pixmap = None
+
+    try:
+        os.replace(tmp_dir, tiles_dir)
+    except OSError:
+        # Another worker finished the same page first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return render_time, encode_time
+
+
+def _extract_vector_page(page: fitz.Page, task: Dict) -> Tuple[float, float]:
+    """
+    Extract text and geometry of a vector page to JSON instead of rendering it.
+    """
+    extract_start = time.time()
+    vector_data = extract_vector_page(page)
+    extract_time = time.time() - extract_start
+
+    encode_start = time.time()
+    vector_path = task["vector_path"]
+    os.makedirs(os.path.dirname(vector_path) or ".", exist_ok=True)
+    tmp_path = f"{vector_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(vector_data, f, separators=(",", ":"))
+    os.replace(tmp_path, vector_path)
+    encode_time = time.time() - encode_start
+    return extract_time, encode_time
+
+
+def _render_pages(document: fitz.Document, tasks: Sequence[Dict]) -> List[Dict]:
+    """
+    Render (or, for vector pages, extract) the given page tasks from an already
+    opened document.
+    """
+    results = []
+    for task in tasks:
+        page = document[task["page_idx"]]
+        page_type = task.get("page_type", "raster")
+        tiled = bool(task.get("tile_size"))
+        if page_type == "vector":
+            render_time, encode_time = _extract_vector_page(page, task)
+        elif tiled:
+            render_time, encode_time = _render_tiled_page(page, task)
+        else:
+            render_time, encode_time = _render_full_page(page, task)
+
+        results.append(
+            {
+                "page_number": task["page_idx"] + 1,
+                "page_type": page_type,
+                "image_path": task.get("image_path"),
+                "vector_path": task.get("vector_path"),
+                "dpi": task.get("dpi"),
+                "colorspace": task.get("colorspace"),
+                "encoding": task.get("encoding"),
+                "tiles": list_tiles(task["image_path"]) if tiled else [],
+                "classification": task.get("classification", {}),
+                "pyramid": task.get("pyramid"),
+                "render_seconds": render_time,
+                "encode_seconds": encode_time,
+            }
+        )
+    return results
+
+
+def _render_pages_in_worker(tasks: Sequence[Dict]) -> List[Dict]:
+    return _render_pages(_worker_document, tasks)
+
+
+class PdfRasterizer:
+    """
+    Renders PDF pages to image files, parsing the document once per worker process
+    and spreading contiguous page ranges across a process pool.
+    """
+
+    def __init__(
+        self, max_workers: Optional[int] = None, dpi: int = 300, colorspace: str = "rgb"
+    ):
+        if colorspace not in COLORSPACES:
+            raise ValueError(f"Unsupported colorspace '{colorspace}'")
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.dpi = dpi
+        self.colorspace = colorspace
+
+    @staticmethod
+    def page_sizes(
+        pdf_source: Union[bytes, str], content_hash: Optional[str] = None
+    ) -> List[Tuple[float, float]]:
+        """
+        Page sizes in PDF points (1/72 inch), in page order. Served from the
+        document session cache for documents seen before.
+        """
+        return get_pdf_page_sizes(pdf_source, content_hash)
+
+    def render_settings(
+        self,
+        page_size: Tuple[float, float],
+        memory_budget: Optional[int] = None,
+        tile_size: Optional[int] = None,
+    ) -> Tuple[int, str, Optional[int]]:
+        """
+        Pick dpi, colorspace and tile size so that one render buffer fits in
+        memory_budget bytes. Grayscale is tried first since line drawings lose
+        almost nothing, then dpi is lowered. Tiled renders only ever hold one
+        tile, so for them the tile is shrunk instead of the page.
+
+        Returns:
+            (dpi, colorspace, tile_size)
+        """
+        dpi = self.dpi
+        colorspace = self.colorspace
+        if not memory_budget:
+            return dpi, colorspace, tile_size
+
+        if tile_size:
+            if tile_size * tile_size * BYTES_PER_PIXEL[colorspace] > memory_budget:
+                colorspace = "gray"
+            max_tile = int(math.sqrt(memory_budget / BYTES_PER_PIXEL[colorspace]))
+            return dpi, colorspace, max(256, min(tile_size, max_tile))
+
+        def buffer_bytes(dpi: int, colorspace: str) -> float:
+            zoom = dpi / 72
+            return (
+                page_size[0] * zoom * page_size[1] * zoom * BYTES_PER_PIXEL[colorspace]
+            )
+
+        if buffer_bytes(dpi, colorspace) > memory_budget:
+            colorspace = "gray"
+        if buffer_bytes(dpi, colorspace) > memory_budget:
+            scale = math.sqrt(memory_budget / buffer_bytes(dpi, colorspace))
+            dpi = max(MIN_DPI, int(dpi * scale))
+        return dpi, colorspace, None
+
+    def split_ranges(self, tasks: Sequence[Dict], workers: int) -> List[List[Dict]]:
+        """
+        Split tasks into contiguous ranges, a few per worker so that slow pages
+        do not leave the other workers idle at the end of a batch.
+        """
+        chunk_size = max(1, math.ceil(len(tasks) / (workers * 4)))
+        return [
+            list(tasks[i : i + chunk_size]) for i in range(0, len(tasks), chunk_size)
+        ]
+
+    def render(
+        self, pdf_source: Union[bytes, str], tasks: Sequence[Dict]
+    ) -> List[Dict]:
+        """
+        Render pages and save them to disk.
+
+        Args:
+            pdf_source: PDF file content as bytes, or path to the PDF file.
+                        A path is preferred: workers then open the file
+                        themselves instead of each receiving a pickled copy.
+            tasks: Page tasks with page_idx (0-based), image_path, dpi, colorspace,
+                   optionally encoding / compress_level, and tile_size /
+                   tile_overlap for tiled output.
+                   Tasks with page_type "vector" have a vector_path instead and
+                   are extracted to JSON rather than rendered.
+
+        Returns:
+            Per-page render results, in the same order as tasks
+        """
+        if not tasks:
+            return []
+
+        workers = min(self.max_workers, len(tasks))
+        if workers == 1:
+            document = open_pdf(pdf_source)
+            try:
+                return _render_pages(document, tasks)
+            finally:
+                document.close()
+
+        results = []
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(pdf_source,),
+        ) as pool:
+            for chunk_results in pool.map(
+                _render_pages_in_worker, self.split_ranges(tasks, workers)
+            ):
+                results.extend(chunk_results)
+        return results
+
+    def render_iter(
+        self, pdf_source: Union[bytes, str], tasks: Sequence[Dict]
+    ) -> Iterator[Dict]:
+        """
+        Render pages and yield each result as soon as its page is saved.
+
+        Pages are queued in the order of tasks, so callers put the pages they
+        need first at the front. Results are yielded in completion order.
+        """
+        if not tasks:
+            return
+
+        workers = min(self.max_workers, len(tasks))
+        if workers == 1:
+            document = open_pdf(pdf_source)
+            try:
+                for task in tasks:
+                    yield _render_pages(document, [task])[0]
+            finally:
+                document.close()
+            return
+
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(pdf_source,),
+        )
+        try:
+            futures = [pool.submit(_render_pages_in_worker, [task]) for task in tasks]
+            for future in as_completed(futures):
+                yield future.result()[0]
+        finally:
+            # Drop queued pages if the consumer stops early (e.g. client disconnect)
+            pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,162 @@
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Union
+
+from utils.document_sessions import content_hash as pdf_content_hash
+
+
+class RenderCache:
+    """
+    Content-addressed on-disk cache of rendered pages with size-bounded LRU eviction.
+
+    Entries are keyed by (PDF content hash, page index, dpi, colorspace), so the same
+    drawing set uploaded under different names shares its rendered pages and two
+    different uploads with the same filename never overwrite each other.
+    An entry is either a single image file or a directory of tiles.
+
+    get and add can pin an entry so that it is not evicted while a response
+    that names it is being built; release unpins it.
+    """
+
+    def __init__(self, root: str = "images/cache", max_bytes: int = 2 * 1024**3):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # path -> size, LRU first
+        self._total_bytes = 0
+        self._pins: Dict[str, int] = {}  # path -> pin count
+        os.makedirs(self.root, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def content_hash(pdf_source: Union[bytes, str]) -> str:
+        return pdf_content_hash(pdf_source)
+
+    def path_for(
+        self, content_hash: str, page_idx: int, dpi: int, colorspace: str, ext: str = "png"
+    ) -> str:
+        return os.path.join(
+            self.root, content_hash, f"page_{page_idx + 1}_{dpi}dpi_{colorspace}.{ext}"
+        )
+
+    def vector_path_for(self, content_hash: str, page_idx: int) -> str:
+        return os.path.join(self.root, content_hash, f"page_{page_idx + 1}_vector.json")
+
+    def get(self, path: str, pin: bool = False) -> Optional[str]:
+        """
+        Return the cached path if present, marking it most recently used.
+        With pin=True the entry is not evicted until it is released.
+        """
+        with self._lock:
+            if path in self._entries and os.path.exists(path):
+                self._entries.move_to_end(path)
+                try:
+                    os.utime(path)  # keep LRU order across restarts
+                except OSError:
+                    pass
+                if pin:
+                    self._pins[path] = self._pins.get(path, 0) + 1
+                return path
+            self._forget(path)
+            return None
+
+    def add(self, path: str, pin: bool = False) -> None:
+        """
+        Register a freshly rendered file and evict least recently used entries
+        until the cache fits in max_bytes. With pin=True the entry is not
+        evicted until it is released.
+        """
+        size = self._entry_size(path)
+        if size is None:
+            return
+        with self._lock:
+            self._forget(path)
+            self._entries[path] = size
+            self._total_bytes += size
+            if pin:
+                self._pins[path] = self._pins.get(path, 0) + 1
+            self._evict(keep=path)
+
+    def release(self, paths: Iterable[str]) -> None:
+        """
+        Unpin entries pinned by get or add, then evict anything the pins
+        kept over max_bytes.
+        """
+        with self._lock:
+            for path in paths:
+                count = self._pins.get(path, 0) - 1
+                if count > 0:
+                    self._pins[path] = count
+                else:
+                    self._pins.pop(path, None)
+            self._evict()
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        # Least recently used first, skipping pinned entries and `keep`
+        if self._total_bytes <= self.max_bytes:
+            return
+        for path in list(self._entries):
+            if self._total_bytes <= self.max_bytes:
+                break
+            if path == keep or path in self._pins:
+                continue
+            self._total_bytes -= self._entries.pop(path)
+            self._remove_entry(path)
+
+    def _forget(self, path: str) -> None:
+        size = self._entries.pop(path, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    @staticmethod
+    def _entry_size(path: str) -> Optional[int]:
+        try:
+            if os.path.isdir(path):
+                return sum(
+                    os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)
+                )
+            return os.path.getsize(path)
+        except OSError:
+            return None
+
+    @staticmethod
+    def _remove_entry(path: str) -> None:
+        # The content hash directory is left in place: a writer may be about
+        # to create its tmp file there. Empty ones are pruned at startup.
+        try:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except OSError:
+            pass
+
+    def _load_index(self) -> None:
+        # Layout is <root>/<content hash>/<entry>
+        entries = []
+        for content_hash in os.listdir(self.root):
+            hash_dir = os.path.join(self.root, content_hash)
+            if not os.path.isdir(hash_dir):
+                continue
+            names = os.listdir(hash_dir)
+            if not names:
+                try:
+                    os.rmdir(hash_dir)
+                except OSError:
+                    pass
+                continue
+            for name in names:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(hash_dir, name)
+                size = self._entry_size(path)
+                if size is None:
+                    continue
+                entries.append((os.path.getmtime(path), path, size))
+        for _, path, size in sorted(entries):
+            self._entries[path] = size
+            self._total_bytes += size
+        # The limit may have been lowered, or another process overfilled it
+        self._evict()
@@ -1,99 +1,559 @@
 import io
 import os
 import time
-from pdf2image import convert_from_bytes
 from PIL import Image
 import numpy as np
-from typing import List, Optional
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
 
-from models.models import Pdf2ImageResponse
+from apps.common.pages import parse_page_ranges
+from models.models import (
+    ImageTile,
+    PageImageResult,
+    PageText,
+    Pdf2ImageResponse,
+    PyramidInfo,
+    RenderOptions,
+    TextExtractionResponse,
+)
+from services.rasterizer import ENCODINGS, PdfRasterizer, encoding_ext, list_tiles
+from services.render_cache import RenderCache
+from services.text_extractor import PdfTextExtractor
+from services.tile_pyramid import TilePyramid
+from utils.pdf_utils import classify_pdf_pages
 
 
 class PdfToImageService:
     """Service for converting PDF files to images"""
 
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        dpi: int = 300,
+        colorspace: str = "rgb",
+        render_cache: Optional[RenderCache] = None,
+    ):
+        self.rasterizer = PdfRasterizer(
+            max_workers=max_workers, dpi=dpi, colorspace=colorspace
+        )
+        self.render_cache = render_cache or RenderCache()
+        self.tile_pyramid = TilePyramid(self.render_cache, dpi=dpi)
+        self.text_extractor = PdfTextExtractor(max_workers=max_workers)
+
+    def _plan_pages(
+        self,
+        total_pages: int,
+        page_number: Optional[int] = None,
+        pages: Optional[str] = None,
+        priority_pages: Optional[str] = None,
+    ) -> List[int]:
+        """
+        Work out which pages to render and in which order.
+
+        Returns:
+            1-based page numbers with priority pages first
+        """
+        # Determine which pages to process
+        try:
+            if page_number is not None:
+                if page_number < 1 or page_number > total_pages:
+                    raise ValueError(
+                        f"Page {page_number} does not exist. PDF has {total_pages} pages."
+                    )
+                selected = [page_number]
+            elif pages:
+                selected = parse_page_ranges(pages, total_pages)
+            else:
+                selected = list(range(1, total_pages + 1))
+
+            priority = (
+                parse_page_ranges(priority_pages, total_pages) if priority_pages else []
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        # Priority pages go first, the rest of the selection keeps its order
+        selected_set = set(selected)
+        ordered = [p for p in priority if p in selected_set]
+        prioritized = set(ordered)
+        ordered += [p for p in selected if p not in prioritized]
+        return ordered
+
+    def _plan_renders(
+        self,
+        pdf_source: Union[bytes, str],
+        page_sizes: List[Tuple[float, float]],
+        page_numbers: List[int],
+        options: RenderOptions,
+        content_hash: Optional[str] = None,
+    ) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Pick render settings for each page and split pages into those already in
+        the render cache and those that still have to be rendered.
+
+        The memory budget is split across the workers that will render
+        concurrently, so the whole request stays within it.
+
+        Returns:
+            (cached page results, render tasks)
+        """
+        if options.tile_size is not None and options.tile_size < 256:
+            raise HTTPException(status_code=400, detail="tile_size must be >= 256")
+        if options.tile_overlap < 0:
+            raise HTTPException(status_code=400, detail="tile_overlap must be >= 0")
+        if options.memory_budget_mb is not None and options.memory_budget_mb <= 0:
+            raise HTTPException(
+                status_code=400, detail="memory_budget_mb must be positive"
+            )
+        if options.encoding not in ENCODINGS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"encoding must be one of {', '.join(ENCODINGS)}",
+            )
+        if options.png_compress_level is not None and not (
+            0 <= options.png_compress_level <= 9
+        ):
+            raise HTTPException(
+                status_code=400, detail="png_compress_level must be between 0 and 9"
+            )
+
+        budget = None
+        if options.memory_budget_mb:
+            workers = max(1, min(self.rasterizer.max_workers, len(page_numbers)))
+            budget = options.memory_budget_mb * 1024 * 1024 // workers
+
+        content_hash = content_hash or self.render_cache.content_hash(pdf_source)
+        classifications = (
+            classify_pdf_pages(pdf_source, page_numbers, content_hash)
+            if options.classify_pages
+            else {}
+        )
+
+        if options.pyramid:
+            # Tiles are rendered lazily from the PDF, so keep it around
+            self.tile_pyramid.store_source(pdf_source, content_hash)
+
+        cached_pages = []
+        tasks = []
+        # Hits are pinned so they are not evicted before the response is built;
+        # the caller releases them
+        try:
+            for page in page_numbers:
+                classification = classifications.get(page, {})
+                pyramid = (
+                    self.tile_pyramid.info(content_hash, page, page_sizes[page - 1])
+                    .model_dump()
+                    if options.pyramid
+                    else None
+                )
+                if classification.get("page_type") == "vector":
+                    # Vector pages skip rasterization, text and geometry come from
+                    # the PDF
+                    path = self.render_cache.vector_path_for(content_hash, page - 1)
+                    task = {
+                        "page_idx": page - 1,
+                        "page_type": "vector",
+                        "vector_path": path,
+                        "classification": classification,
+                        "pyramid": pyramid,
+                    }
+                    if self.render_cache.get(path, pin=True):
+                        cached_pages.append(self._cached_result(task))
+                    else:
+                        tasks.append(task)
+                    continue
+
+                dpi, colorspace, tile_size = self.rasterizer.render_settings(
+                    page_sizes[page - 1], budget, options.tile_size
+                )
+                if options.encoding == "bilevel":
+                    colorspace = "gray"  # thresholded anyway, no need to render color
+                tile_overlap = (
+                    min(options.tile_overlap, tile_size // 2) if tile_size else 0
+                )
+                ext = encoding_ext(options.encoding, colorspace)
+                if tile_size:
+                    ext = f"t{tile_size}o{tile_overlap}.{ext}.tiles"
+                path = self.render_cache.path_for(
+                    content_hash, page - 1, dpi, colorspace, ext
+                )
+                task = {
+                    "page_idx": page - 1,
+                    "page_type": "raster",
+                    "image_path": path,
+                    "dpi": dpi,
+                    "colorspace": colorspace,
+                    "encoding": options.encoding,
+                    "compress_level": options.png_compress_level,
+                    "tile_size": tile_size,
+                    "tile_overlap": tile_overlap,
+                    "classification": classification,
+                    "pyramid": pyramid,
+                }
+                if self.render_cache.get(path, pin=True):
+                    cached_pages.append(self._cached_result(task))
+                else:
+                    tasks.append(task)
+        except BaseException:
+            self.render_cache.release(self._output_path(p) for p in cached_pages)
+            raise
+        return cached_pages, tasks
+
+    @staticmethod
+    def _cached_result(task: Dict) -> Dict:
+        tiled = bool(task.get("tile_size"))
+        return {
+            "page_number": task["page_idx"] + 1,
+            "page_type": task["page_type"],
+            "image_path": task.get("image_path"),
+            "vector_path": task.get("vector_path"),
+            "dpi": task.get("dpi"),
+            "colorspace": task.get("colorspace"),
+            "encoding": task.get("encoding"),
+            "tiles": list_tiles(task["image_path"]) if tiled else [],
+            "classification": task["classification"],
+            "pyramid": task["pyramid"],
+            "render_seconds": 0.0,
+            "encode_seconds": 0.0,
+        }
+
+    @staticmethod
+    def _output_path(page: Dict) -> str:
+        return page["image_path"] or page["vector_path"]
+
+    @staticmethod
+    def _page_result(page: Dict, cache_hit: bool, **timings: float) -> PageImageResult:
+        return PageImageResult(
+            page_number=page["page_number"],
+            image_path=page["image_path"],
+            processing_time={
+                "render_seconds": page["render_seconds"],
+                "encode_seconds": page["encode_seconds"],
+                "classify_seconds": page["classification"].get("classify_seconds", 0.0),
+                "cache_hit": float(cache_hit),
+                **timings,
+            },
+            status="Extracted" if page["page_type"] == "vector" else "Rendered",
+            dpi=page["dpi"],
+            colorspace=page["colorspace"],
+            encoding=page["encoding"],
+            tiles=[ImageTile(**tile) for tile in page["tiles"]],
+            page_type=page["page_type"],
+            vector_path=page["vector_path"],
+            classification=page["classification"],
+            pyramid=PyramidInfo(**page["pyramid"]) if page.get("pyramid") else None,
+        )
+
+    @staticmethod
+    def _summary_times(page_results: List[PageImageResult]) -> Dict[str, float]:
+        # Encode time per output encoding, e.g. "webp_encode_seconds"
+        encoding_times: Dict[str, float] = {}
+        for p in page_results:
+            if p.encoding:
+                key = f"{p.encoding}_encode_seconds"
+                encoding_times[key] = (
+                    encoding_times.get(key, 0.0) + p.processing_time["encode_seconds"]
+                )
+        return {
+            "render_seconds": sum(
+                p.processing_time["render_seconds"] for p in page_results
+            ),
+            "encode_seconds": sum(
+                p.processing_time["encode_seconds"] for p in page_results
+            ),
+            "classify_seconds": sum(
+                p.processing_time["classify_seconds"] for p in page_results
+            ),
+            "cache_hits": sum(p.processing_time["cache_hit"] for p in page_results),
+            "cache_misses": sum(
+                1 - p.processing_time["cache_hit"] for p in page_results
+            ),
+            "vector_pages": sum(p.page_type == "vector" for p in page_results),
+            "raster_pages": sum(p.page_type == "raster" for p in page_results),
+            **encoding_times,
+        }
+
     async def process_pdf(
         self,
-        file_content: bytes,
+        pdf_source: Union[bytes, str],
         filename: str,
         page_number: Optional[int] = None,
+        pages: Optional[str] = None,
+        priority_pages: Optional[str] = None,
+        options: Optional[RenderOptions] = None,
+        content_hash: Optional[str] = None,
     ) -> Pdf2ImageResponse:
         """
         Convert PDF file to images and save them to disk.
 
+        Rendering is CPU-bound, so it runs in a worker thread and the event
+        loop stays free for other requests. See convert_pdf for the arguments.
+        """
+        return await run_in_threadpool(
+            self.convert_pdf,
+            pdf_source,
+            filename,
+            page_number,
+            pages,
+            priority_pages,
+            options,
+            content_hash,
+        )
+
+    def convert_pdf(
+        self,
+        pdf_source: Union[bytes, str],
+        filename: str,
+        page_number: Optional[int] = None,
+        pages: Optional[str] = None,
+        priority_pages: Optional[str] = None,
+        options: Optional[RenderOptions] = None,
+        content_hash: Optional[str] = None,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> Pdf2ImageResponse:
+        """
+        Convert PDF file to images and save them to disk (blocking).
+
         Args:
-            file_content: PDF file content as bytes
+            pdf_source: PDF file content as bytes, or path to a spooled upload
             filename: Original filename
             page_number: Specific page to process (None for all pages)
+            pages: Page selection such as "1-3,7" (ignored if page_number is set)
+            priority_pages: Pages to render before the rest of the selection
+            options: Tiling and memory budget settings
+            content_hash: sha256 of the PDF if already known (skips re-hashing)
+            progress: Called with (pages done, pages total) after every page
 
         Returns:
             dict with image file paths and metadata
         """
         start_time = time.time()
+        options = options or RenderOptions()
 
         try:
-            from PyPDF2 import PdfReader
-            from io import BytesIO
+            content_hash = content_hash or self.render_cache.content_hash(pdf_source)
+            page_sizes = self.rasterizer.page_sizes(pdf_source, content_hash)
+            page_numbers = self._plan_pages(
+                len(page_sizes), page_number, pages, priority_pages
+            )
+            cached_pages, tasks = self._plan_renders(
+                pdf_source, page_sizes, page_numbers, options, content_hash
+            )
 
-            # Get total pages using PyPDF2 (lightweight)
-            pdf = PdfReader(BytesIO(file_content))
-            total_pages = len(pdf.pages)
+            # Pages in the response stay pinned in the cache until it is built
+            pinned = [self._output_path(p) for p in cached_pages]
+            try:
+                # Render the missing pages across the worker pool
+                pdf_to_image_start = time.time()
+                if progress is None:
+                    rendered_pages = self.rasterizer.render(pdf_source, tasks)
+                    for page in rendered_pages:
+                        self.render_cache.add(self._output_path(page), pin=True)
+                        pinned.append(self._output_path(page))
+                else:
+                    # Page by page so progress can be reported as pages finish
+                    total = len(cached_pages) + len(tasks)
+                    progress(len(cached_pages), total)
+                    rendered_pages = []
+                    for page in self.rasterizer.render_iter(pdf_source, tasks):
+                        self.render_cache.add(self._output_path(page), pin=True)
+                        pinned.append(self._output_path(page))
+                        rendered_pages.append(page)
+                        progress(len(cached_pages) + len(rendered_pages), total)
+                pdf_to_image_time = time.time() - pdf_to_image_start
 
-            # Create output folder for images if it doesn't exist
-            images_folder = "images"
-            os.makedirs(images_folder, exist_ok=True)
+                page_results = sorted(
+                    [self._page_result(p, cache_hit=True) for p in cached_pages]
+                    + [self._page_result(p, cache_hit=False) for p in rendered_pages],
+                    key=lambda p: p.page_number,
+                )
 
-            image_paths = []
-            pdf_to_image_time = 0
+                total_time = time.time() - start_time
 
-            # Determine which pages to process
-            if page_number is not None:
-                if page_number > total_pages:
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Page {page_number} does not exist. PDF has {total_pages} pages.",
-                    )
-                pages_to_process = [page_number - 1]  # 0-based indexing
-            else:
-                pages_to_process = range(total_pages)
-
-            for page_idx in pages_to_process:
-                # Convert single page to image
-                page_to_image_start = time.time()
-                images = convert_from_bytes(
-                    file_content,
-                    dpi=300,
-                    first_page=page_idx + 1,
-                    last_page=page_idx + 1,
+                return Pdf2ImageResponse(
+                    filename=filename,
+                    image_paths=[p.image_path for p in page_results if p.image_path],
+                    processing_time={
+                        "total_seconds": total_time,
+                        "pdf_to_image_seconds": pdf_to_image_time,
+                        **self._summary_times(page_results),
+                    },
+                    status="Completed",
+                    pages=page_results,
                 )
-                img = images[0]  # We only converted one page
-                pdf_to_image_time += time.time() - page_to_image_start
+            finally:
+                self.render_cache.release(pinned)
 
-                # Save the image to disk
-                image_filename = (
-                    f"{os.path.splitext(filename)[0]}_page_{page_idx + 1}.png"
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=500, detail=f"Error processing PDF: {str(e)}"
+            )
+
+    def stream_pdf(
+        self,
+        pdf_source: Union[bytes, str],
+        filename: str,
+        page_number: Optional[int] = None,
+        pages: Optional[str] = None,
+        priority_pages: Optional[str] = None,
+        options: Optional[RenderOptions] = None,
+        content_hash: Optional[str] = None,
+    ) -> Iterator[str]:
+        """
+        Convert PDF file to images, streaming one NDJSON line per page as soon as
+        it is saved, followed by a final Pdf2ImageResponse line.
+
+        Page selection is validated before streaming starts so bad requests still
+        get a 400 instead of a truncated stream.
+        """
+        content_hash = content_hash or self.render_cache.content_hash(pdf_source)
+        page_sizes = self.rasterizer.page_sizes(pdf_source, content_hash)
+        page_numbers = self._plan_pages(
+            len(page_sizes), page_number, pages, priority_pages
+        )
+        cached_pages, tasks = self._plan_renders(
+            pdf_source,
+            page_sizes,
+            page_numbers,
+            options or RenderOptions(),
+            content_hash,
+        )
+        return self._stream_pages(pdf_source, filename, cached_pages, tasks)
+
+    def _stream_pages(
+        self,
+        pdf_source: Union[bytes, str],
+        filename: str,
+        cached_pages: List[Dict],
+        tasks: List[Dict],
+    ) -> Iterator[str]:
+        start_time = time.time()
+        page_results = []
+        pinned = [self._output_path(p) for p in cached_pages]
+        try:
+            # Cached pages are ready right away
+            for page in cached_pages:
+                result = self._page_result(
+                    page, cache_hit=True, elapsed_seconds=time.time() - start_time
                 )
-                image_path = os.path.join(images_folder, image_filename)
-                img.save(image_path, "PNG")
-                image_paths.append(image_path)
+                page_results.append(result)
+                yield result.model_dump_json() + "\n"
 
-            total_time = time.time() - start_time
+            for page in self.rasterizer.render_iter(pdf_source, tasks):
+                self.render_cache.add(self._output_path(page), pin=True)
+                pinned.append(self._output_path(page))
+                result = self._page_result(
+                    page, cache_hit=False, elapsed_seconds=time.time() - start_time
+                )
+                page_results.append(result)
+                yield result.model_dump_json() + "\n"
 
-            return Pdf2ImageResponse(
+            page_results.sort(key=lambda p: p.page_number)
+            yield Pdf2ImageResponse(
                 filename=filename,
-                image_paths=image_paths,
+                image_paths=[p.image_path for p in page_results if p.image_path],
                 processing_time={
-                    "total_seconds": total_time,
-                    "pdf_to_image_seconds": pdf_to_image_time,
+                    "total_seconds": time.time() - start_time,
+                    **self._summary_times(page_results),
                 },
                 status="Completed",
-            )
+                pages=page_results,
+            ).model_dump_json() + "\n"
+        finally:
+            # Also runs when the client disconnects and the stream is closed
+            self.render_cache.release(pinned)
 
-        except Exception as e:
-            raise HTTPException(
-                status_code=500, detail=f"Error processing PDF: {str(e)}"
+    def extract_text(
+        self,
+        pdf_source: Union[bytes, str],
+        filename: str,
+        pages: Optional[str] = None,
+        content_hash: Optional[str] = None,
+    ) -> TextExtractionResponse:
+        """
+        Extract positioned text spans from the PDF's text layer (no rendering).
+
+        Args:
+            pdf_source: PDF file content as bytes, or path to a spooled upload
+            filename: Original filename
+            pages: Page selection such as "1-3,7" (None for all pages)
+            content_hash: sha256 of the PDF if already known (skips re-hashing)
+
+        Returns:
+            TextExtractionResponse with per-page span arrays, in page order
+        """
+        start_time = time.time()
+        page_idxs, content_hash = self._plan_text(pdf_source, pages, content_hash)
+        page_texts = [
+            PageText(**page)
+            for page in self.text_extractor.extract_iter(
+                pdf_source, page_idxs, content_hash
             )
+        ]
+        return self._text_response(filename, page_texts, start_time)
+
+    def stream_text(
+        self,
+        pdf_source: Union[bytes, str],
+        filename: str,
+        pages: Optional[str] = None,
+        content_hash: Optional[str] = None,
+    ) -> Iterator[str]:
+        """
+        Extract positioned text spans, streaming one NDJSON line per page as
+        soon as it is extracted, followed by a final TextExtractionResponse line.
+
+        Page selection is validated before streaming starts.
+        """
+        page_idxs, content_hash = self._plan_text(pdf_source, pages, content_hash)
+        return self._stream_text(pdf_source, filename, page_idxs, content_hash)
+
+    def _plan_text(
+        self,
+        pdf_source: Union[bytes, str],
+        pages: Optional[str],
+        content_hash: Optional[str],
+    ) -> Tuple[List[int], str]:
+        content_hash = content_hash or self.render_cache.content_hash(pdf_source)
+        page_sizes = self.rasterizer.page_sizes(pdf_source, content_hash)
+        page_numbers = self._plan_pages(len(page_sizes), pages=pages)
+        return [p - 1 for p in page_numbers], content_hash
+
+    def _stream_text(
+        self,
+        pdf_source: Union[bytes, str],
+        filename: str,
+        page_idxs: List[int],
+        content_hash: str,
+    ) -> Iterator[str]:
+        start_time = time.time()
+        page_texts = []
+        for page in self.text_extractor.extract_iter(
+            pdf_source, page_idxs, content_hash
+        ):
+            page_text = PageText(**page)
+            page_texts.append(page_text)
+            yield page_text.model_dump_json() + "\n"
+        yield self._text_response(
+            filename, page_texts, start_time
+        ).model_dump_json() + "\n"
+
+    @staticmethod
+    def _text_response(
+        filename: str, page_texts: List[PageText], start_time: float
+    ) -> TextExtractionResponse:
+        return TextExtractionResponse(
+            filename=filename,
+            pages=sorted(page_texts, key=lambda p: p.page_number),
+            processing_time={
+                "total_seconds": time.time() - start_time,
+                "spans": sum(len(p.text) for p in page_texts),
+            },
+            status="Completed",
+        )
 
     async def process_image(
         self,
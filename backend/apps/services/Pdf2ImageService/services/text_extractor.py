@@ -0,0 +1,83 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+
+import fitz  # PyMuPDF
+
+from utils.pdf_utils import document_sessions, extract_page_spans, open_pdf
+
+# Document opened once per worker process by the pool initializer
+_worker_document = None
+
+
+def _init_worker(pdf_source: Union[bytes, str]) -> None:
+    global _worker_document
+    _worker_document = open_pdf(pdf_source)
+
+
+def _extract_pages(document: fitz.Document, page_idxs: Sequence[int]) -> List[Dict]:
+    return [extract_page_spans(document[idx]) for idx in page_idxs]
+
+
+def _extract_pages_in_worker(page_idxs: Sequence[int]) -> List[Dict]:
+    return _extract_pages(_worker_document, page_idxs)
+
+
+class PdfTextExtractor:
+    """
+    Extracts positioned text spans from PDF pages, spreading contiguous page
+    ranges across a process pool with the document parsed once per worker.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    @staticmethod
+    def split_ranges(page_idxs: Sequence[int], workers: int) -> List[List[int]]:
+        """
+        Contiguous page ranges, a few per worker to even out dense sheets.
+        """
+        chunk_size = max(1, math.ceil(len(page_idxs) / (workers * 4)))
+        return [
+            list(page_idxs[i : i + chunk_size])
+            for i in range(0, len(page_idxs), chunk_size)
+        ]
+
+    def extract_iter(
+        self,
+        pdf_source: Union[bytes, str],
+        page_idxs: Sequence[int],
+        content_hash: Optional[str] = None,
+    ) -> Iterator[Dict]:
+        """
+        Extract spans of the given pages (0-based), yielding each page's arrays
+        as soon as its range is done. Pages come out in completion order.
+        """
+        if not page_idxs:
+            return
+
+        workers = min(self.max_workers, len(page_idxs))
+        if workers == 1:
+            with document_sessions.session(pdf_source, content_hash) as session:
+                for idx in page_idxs:
+                    with session.lock:
+                        page = extract_page_spans(session.document[idx])
+                    yield page
+            return
+
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(pdf_source,),
+        )
+        try:
+            futures = [
+                pool.submit(_extract_pages_in_worker, chunk)
+                for chunk in self.split_ranges(page_idxs, workers)
+            ]
+            for future in as_completed(futures):
+                yield from future.result()
+        finally:
+            # Drop queued ranges if the consumer stops early
+            pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,211 @@
+import math
+import os
+import re
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional, Set, Tuple, Union
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+from models.models import PyramidInfo
+from services.render_cache import RenderCache
+from utils.document_sessions import DocumentSession
+from utils.pdf_utils import document_sessions, pixmap_to_array
+
+TILE_FORMATS = {"png": "image/png", "jpg": "image/jpeg", "webp": "image/webp"}
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+
+_CONTENT_HASH = re.compile(r"[0-9a-f]{64}$")
+
+
+class TilePyramid:
+    """
+    Deep Zoom tile pyramids of PDF pages, rendered lazily from the PDF itself.
+
+    Level max_level is the page at full dpi and each level below halves it, down
+    to level 0 at one pixel. Tiles are tile_size pixels square plus `overlap`
+    pixels on inner edges (the Deep Zoom layout). Each tile is rendered from the
+    page's cached display list at its level's zoom on first request, so every
+    level is sharp, and is then kept in the render cache next to the page images.
+    """
+
+    def __init__(
+        self,
+        render_cache: RenderCache,
+        dpi: int = 300,
+        tile_size: int = 256,
+        overlap: int = 1,
+    ):
+        self.render_cache = render_cache
+        self.dpi = dpi
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self._sources_lock = threading.Lock()
+        self._pinned_sources: Set[str] = set()
+
+    def source_path(self, content_hash: str) -> str:
+        if not _CONTENT_HASH.match(content_hash):
+            raise FileNotFoundError(f"Unknown document {content_hash}")
+        return os.path.join(self.render_cache.root, content_hash, "source.pdf")
+
+    def store_source(self, pdf_source: Union[bytes, str], content_hash: str) -> None:
+        """
+        Keep the PDF in the render cache so tiles can be rendered later.
+        """
+        path = self.source_path(content_hash)
+        if self._pin_source(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        if isinstance(pdf_source, str):
+            try:
+                os.link(pdf_source, tmp_path)  # spooled upload on the same disk
+            except OSError:
+                shutil.copyfile(pdf_source, tmp_path)
+        else:
+            with open(tmp_path, "wb") as f:
+                f.write(pdf_source)
+        os.replace(tmp_path, path)
+        self._pin_source(path, added=True)
+
+    def _pin_source(self, path: str, added: bool = False) -> Optional[str]:
+        """
+        Look up (or, with added=True, register) a source PDF in the render
+        cache, pinning it the first time so LRU eviction never drops a document
+        whose tiles are still being served.
+        """
+        with self._sources_lock:
+            pin = path not in self._pinned_sources
+            if added:
+                self.render_cache.add(path, pin=pin)
+                found = path
+            else:
+                found = self.render_cache.get(path, pin=pin)
+            if found:
+                self._pinned_sources.add(path)
+            return found
+
+    def info(
+        self,
+        content_hash: str,
+        page_number: int,
+        page_size: Optional[Tuple[float, float]] = None,
+    ) -> PyramidInfo:
+        """
+        Pyramid layout of a page. page_size in PDF points avoids opening the PDF.
+        """
+        if page_size is None:
+            with self._session(content_hash) as session:
+                if not 1 <= page_number <= session.page_count:
+                    raise FileNotFoundError(f"Page {page_number} does not exist")
+                page_size = session.page_sizes[page_number - 1]
+
+        width = math.ceil(page_size[0] * self.dpi / 72)
+        height = math.ceil(page_size[1] * self.dpi / 72)
+        return PyramidInfo(
+            content_hash=content_hash,
+            page_number=page_number,
+            width=width,
+            height=height,
+            dpi=self.dpi,
+            tile_size=self.tile_size,
+            overlap=self.overlap,
+            max_level=math.ceil(math.log2(max(width, height, 1))),
+            tile_url=(
+                f"pyramids/{content_hash}/{page_number}/{{level}}/{{col}}_{{row}}.png"
+            ),
+        )
+
+    def tile(
+        self,
+        content_hash: str,
+        page_number: int,
+        level: int,
+        col: int,
+        row: int,
+        fmt: str = "png",
+    ) -> str:
+        """
+        Path of a tile image, rendering it first if it is not cached yet.
+        The tile is pinned in the render cache; release it once it is served.
+
+        Raises:
+            FileNotFoundError: unknown document or page, or a tile outside the level
+            ValueError: unsupported format
+        """
+        if not _CONTENT_HASH.match(content_hash):
+            raise FileNotFoundError(f"Unknown document {content_hash}")
+        if fmt not in TILE_FORMATS:
+            raise ValueError(f"Unsupported tile format '{fmt}'")
+        ext = f"dz{level}_{col}_{row}.{fmt}"
+        path = self.render_cache.path_for(
+            content_hash, page_number - 1, self.dpi, "rgb", ext
+        )
+        if self.render_cache.get(path, pin=True):
+            return path
+
+        pyramid = self.info(content_hash, page_number)
+        if not 0 <= level <= pyramid.max_level:
+            raise FileNotFoundError(f"Level {level} does not exist")
+        scale = 2.0 ** (level - pyramid.max_level)
+        level_width = math.ceil(pyramid.width * scale)
+        level_height = math.ceil(pyramid.height * scale)
+        x0 = col * self.tile_size - (self.overlap if col > 0 else 0)
+        y0 = row * self.tile_size - (self.overlap if row > 0 else 0)
+        if col < 0 or row < 0 or x0 >= level_width or y0 >= level_height:
+            raise FileNotFoundError(
+                f"Tile {col}_{row} does not exist on level {level}"
+            )
+        x1 = min(level_width, (col + 1) * self.tile_size + self.overlap)
+        y1 = min(level_height, (row + 1) * self.tile_size + self.overlap)
+
+        zoom = self.dpi / 72 * scale
+        # The page is interpreted once into a display list shared by all its
+        # tiles; only building it takes the session lock
+        with self._session(content_hash) as session:
+            display_list = session.display_list(page_number - 1)
+            rect = display_list.rect
+            clip = fitz.Rect(
+                rect.x0 + x0 / zoom,
+                rect.y0 + y0 / zoom,
+                rect.x0 + x1 / zoom,
+                rect.y0 + y1 / zoom,
+            )
+            pixmap = display_list.get_pixmap(
+                matrix=fitz.Matrix(zoom, zoom),
+                colorspace=fitz.csRGB,
+                alpha=False,
+                clip=clip,
+            )
+
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        if fmt == "png":
+            pixmap.save(tmp_path, output="png")
+        elif fmt == "jpg":
+            pixmap.save(tmp_path, output="jpeg", jpg_quality=JPEG_QUALITY)
+        else:
+            Image.fromarray(pixmap_to_array(pixmap)).save(
+                tmp_path, format="WEBP", quality=WEBP_QUALITY
+            )
+        os.replace(tmp_path, path)
+        self.render_cache.add(path, pin=True)
+        return path
+
+    @contextmanager
+    def _session(self, content_hash: str) -> Iterator[DocumentSession]:
+        session = document_sessions.get(content_hash)
+        if session is None:
+            source = self._pin_source(self.source_path(content_hash))
+            if source is None:
+                raise FileNotFoundError(
+                    f"Document {content_hash} is not cached, "
+                    "process it with pyramid=true"
+                )
+            session = document_sessions.open(source, content_hash)
+        try:
+            yield session
+        finally:
+            document_sessions.release(session)
@@ -5,6 +5,17 @@ Test script for the Pdf2Image service
 
 import requests
 import os
+import sys
+
+import fitz  # PyMuPDF
+import numpy as np
+
+# Service root, for 'utils'
+SERVICE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if SERVICE_DIR not in sys.path:
+    sys.path.insert(0, SERVICE_DIR)
+
+from utils.pdf_utils import convert_pdf_to_images, iter_pdf_images
 
 
 def test_health_check():
@@ -51,6 +62,44 @@ def test_pdf_processing(pdf_path):
         return False
 
 
+def test_iter_pdf_images(pdf_path):
+    """Test that pages collected from iter_pdf_images stay valid"""
+    if not os.path.exists(pdf_path):
+        print(f"PDF file not found: {pdf_path}")
+        return False
+
+    try:
+        with open(pdf_path, "rb") as f:
+            pdf_bytes = f.read()
+        page_numbers = list(range(1, 4))
+
+        # Collect first so earlier pages outlive the generator step that made them
+        collected = list(iter_pdf_images(pdf_bytes, page_numbers))
+        converted = convert_pdf_to_images(pdf_bytes, page_numbers)
+
+        document = fitz.open(stream=pdf_bytes, filetype="pdf")
+        rendered = []
+        for page_idx in range(min(len(page_numbers), document.page_count)):
+            pixmap = document[page_idx].get_pixmap(
+                matrix=fitz.Matrix(2.0, 2.0), colorspace=fitz.csRGB, alpha=False
+            )
+            rendered.append(
+                np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(
+                    pixmap.height, pixmap.width, pixmap.n
+                )
+            )
+
+        same = len(collected) == len(converted) == len(rendered) and all(
+            np.array_equal(a, b) and np.array_equal(a, c)
+            for a, b, c in zip(collected, converted, rendered)
+        )
+        print(f"iter_pdf_images pages: {len(collected)}, match: {same}")
+        return same
+    except Exception as e:
+        print(f"iter_pdf_images test failed: {e}")
+        return False
+
+
 def main():
     """Run all tests"""
     print("=== Pdf2Image Service Test Suite ===\n")
@@ -66,16 +115,21 @@ def main():
         print("2. Testing PDF to image conversion...")
         pdf_ok = test_pdf_processing(pdf_path)
         print()
+        print("3. Testing iter_pdf_images against convert_pdf_to_images...")
+        iter_ok = test_iter_pdf_images(pdf_path)
+        print()
     else:
         print("2. Skipping PDF test (no test_data.pdf found)")
         pdf_ok = True
+        iter_ok = True
         print()
 
     # Summary
     print("=== Test Summary ===")
     print(f"Health check: {'✓' if health_ok else '✗'}")
     print(f"PDF to image: {'✓' if pdf_ok else '✗'}")
-    all_passed = health_ok and pdf_ok
+    print(f"Page iterator: {'✓' if iter_ok else '✗'}")
+    all_passed = health_ok and pdf_ok and iter_ok
     print(f"\nOverall: {'✓ All tests passed' if all_passed else '✗ Some tests failed'}")
 
 
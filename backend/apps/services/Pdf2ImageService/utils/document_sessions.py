@@ -0,0 +1,192 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import fitz  # PyMuPDF
+
+# Display lists kept per session, most recently used pages first
+MAX_DISPLAY_LISTS = 4
+
+
+def open_pdf(pdf_source: Union[bytes, str]) -> fitz.Document:
+    """
+    Open a PDF from its content or, for spooled uploads, from its path.
+    Opening by path lets MuPDF read pages on demand instead of needing the
+    whole file in memory.
+    """
+    if isinstance(pdf_source, str):
+        return fitz.open(pdf_source, filetype="pdf")
+    return fitz.open(stream=io.BytesIO(pdf_source), filetype="pdf")
+
+
+def content_hash(pdf_source: Union[bytes, str]) -> str:
+    """
+    sha256 of the PDF content; a path is hashed in chunks from disk.
+    """
+    if not isinstance(pdf_source, str):
+        return hashlib.sha256(pdf_source).hexdigest()
+    hasher = hashlib.sha256()
+    with open(pdf_source, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class DocumentSession:
+    """
+    A parsed PDF with the metadata and text read from it so far.
+
+    MuPDF documents are not thread-safe, so hold `lock` while using
+    `document` directly. page_sizes, page_text and display_list take it
+    themselves.
+    """
+
+    def __init__(self, content_hash: str, document: fitz.Document):
+        self.content_hash = content_hash
+        self.document = document
+        self.page_count = len(document)
+        self.lock = threading.RLock()
+        self._page_sizes: Optional[List[Tuple[float, float]]] = None
+        self._text: Dict[int, str] = {}
+        self._display_lists: "OrderedDict[int, fitz.DisplayList]" = OrderedDict()
+        # Callers holding the session, and whether the LRU has dropped it;
+        # both guarded by DocumentSessions._lock
+        self._users = 0
+        self._evicted = False
+
+    @property
+    def page_sizes(self) -> List[Tuple[float, float]]:
+        """
+        Page sizes in PDF points (1/72 inch), in page order.
+        """
+        if self._page_sizes is None:
+            with self.lock:
+                self._page_sizes = [
+                    (page.rect.width, page.rect.height) for page in self.document
+                ]
+        return self._page_sizes
+
+    def page_text(self, page_idx: int) -> str:
+        """
+        Plain text of a page (0-based index), extracted once.
+        """
+        text = self._text.get(page_idx)
+        if text is None:
+            with self.lock:
+                text = self.document[page_idx].get_text()
+            self._text[page_idx] = text
+        return text
+
+    def display_list(self, page_idx: int) -> fitz.DisplayList:
+        """
+        Display list of a page (0-based index), built once from the content
+        stream. Rendering clips from it does not interpret the page again and
+        needs no lock, so many tiles of one page can be rendered from it.
+        """
+        with self.lock:
+            display_list = self._display_lists.get(page_idx)
+            if display_list is None:
+                display_list = self.document[page_idx].get_displaylist()
+                self._display_lists[page_idx] = display_list
+                while len(self._display_lists) > MAX_DISPLAY_LISTS:
+                    self._display_lists.popitem(last=False)
+            self._display_lists.move_to_end(page_idx)
+            return display_list
+
+    def close(self) -> None:
+        with self.lock:
+            self._display_lists.clear()
+            self.document.close()
+
+
+class DocumentSessions:
+    """
+    Bounded LRU of document sessions keyed by content hash, so a PDF that has
+    been seen recently is not parsed again.
+
+    Sessions are reference counted: get and open hand out a session that the
+    caller gives back with release, or use session() as a context manager. An
+    evicted document is closed once no caller holds it any more, which also
+    frees a spooled upload that was unlinked while the document was open.
+    """
+
+    def __init__(self, max_sessions: int = 8):
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, DocumentSession]" = OrderedDict()
+
+    def get(self, content_hash: str) -> Optional[DocumentSession]:
+        """
+        The cached session for a content hash, if any. Release it when done.
+        """
+        with self._lock:
+            session = self._sessions.get(content_hash)
+            if session is not None:
+                self._sessions.move_to_end(content_hash)
+                session._users += 1
+            return session
+
+    def open(
+        self, pdf_source: Union[bytes, str], pdf_hash: Optional[str] = None
+    ) -> DocumentSession:
+        """
+        Session for a PDF, parsing it only if it is not cached yet. Release it
+        when done.
+
+        Args:
+            pdf_source: PDF file content as bytes, or path to the PDF file
+            pdf_hash: sha256 of the content if already known (skips hashing)
+        """
+        pdf_hash = pdf_hash or content_hash(pdf_source)
+        session = self.get(pdf_hash)
+        if session is not None:
+            return session
+
+        # Parse outside the lock; if two threads race, the first one wins
+        document = open_pdf(pdf_source)
+        evicted = []
+        with self._lock:
+            session = self._sessions.get(pdf_hash)
+            if session is None:
+                session = DocumentSession(pdf_hash, document)
+                self._sessions[pdf_hash] = session
+                document = None
+            self._sessions.move_to_end(pdf_hash)
+            session._users += 1
+            while len(self._sessions) > self.max_sessions:
+                _, old = self._sessions.popitem(last=False)
+                old._evicted = True
+                if old._users == 0:
+                    evicted.append(old)
+        if document is not None:
+            document.close()
+        for old in evicted:
+            old.close()
+        return session
+
+    def release(self, session: DocumentSession) -> None:
+        """
+        Give back a session from get or open; closes it if it was evicted and
+        this was the last user.
+        """
+        with self._lock:
+            session._users -= 1
+            close = session._evicted and session._users == 0
+        if close:
+            session.close()
+
+    @contextmanager
+    def session(
+        self, pdf_source: Union[bytes, str], pdf_hash: Optional[str] = None
+    ) -> Iterator[DocumentSession]:
+        """
+        open and release around a block.
+        """
+        session = self.open(pdf_source, pdf_hash)
+        try:
+            yield session
+        finally:
+            self.release(session)
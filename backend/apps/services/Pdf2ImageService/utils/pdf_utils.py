@@ -1,93 +1,362 @@
 import fitz  # PyMuPDF
-import io
-from PIL import Image
+import math
+import time
 import numpy as np
-from typing import List, Tuple, Optional
+from typing import Any, Dict, Iterator, List, Tuple, Optional, Union
+
+from utils.document_sessions import DocumentSessions, open_pdf
+
+# Parsed documents shared by every entry point below
+document_sessions = DocumentSessions()
+
+# Page classification thresholds
+SCANNED_IMAGE_COVERAGE = 0.6  # share of the page covered by raster images
+MIN_VECTOR_CONTENT = 1  # visible text spans + drawing ops needed to trust the vector layer
+INVISIBLE_TEXT = 3  # PDF text render mode used by OCR text layers on scans
+
+
+class _PixmapSamples:
+    """
+    Exposes a pixmap's samples through the numpy array interface and keeps
+    the pixmap alive for as long as an array built on it exists.
+    """
+
+    def __init__(self, pixmap: fitz.Pixmap):
+        self.pixmap = pixmap
+        if pixmap.n == 1:
+            shape, strides = (pixmap.height, pixmap.width), (pixmap.stride, 1)
+        else:
+            shape = (pixmap.height, pixmap.width, pixmap.n)
+            strides = (pixmap.stride, pixmap.n, 1)
+        self.__array_interface__ = {
+            "version": 3,
+            "shape": shape,
+            "strides": strides,
+            "typestr": "|u1",
+            "data": (pixmap.samples_ptr, False),
+        }
+
+
+def pixmap_to_array(pixmap: fitz.Pixmap) -> np.ndarray:
+    """
+    Wrap a pixmap's samples as a numpy array without copying.
+    Shape is (height, width) for grayscale, (height, width, n) otherwise.
+    The array's base holds a reference to the pixmap, so it stays valid after
+    the caller drops the pixmap.
+    """
+    return np.asarray(_PixmapSamples(pixmap))
+
+
+def iter_pdf_images(
+    pdf_source: Union[bytes, str],
+    page_numbers: Optional[List[int]] = None,
+    zoom: float = 2.0,
+    grayscale: bool = False,
+    content_hash: Optional[str] = None,
+) -> Iterator[np.ndarray]:
+    """
+    Render PDF pages one at a time, yielding each as a numpy view on the pixmap
+
+    Pages are rendered as the caller asks for them and there is no PNG
+    round-trip. Each array owns its pixmap, so a page is freed once the caller
+    drops it and pages that are kept stay valid.
+
+    Args:
+        pdf_source: PDF file content as bytes, or path to the PDF file
+        page_numbers: List of page numbers to convert (1-based). If None, convert all pages.
+        zoom: Scale factor from PDF points (2.0 is 144 dpi)
+        grayscale: Render in grayscale (one channel) instead of RGB
+        content_hash: sha256 of the PDF if already known (skips hashing)
+
+    Yields:
+        Images as numpy arrays, in page_numbers order
+    """
+    colorspace = fitz.csGRAY if grayscale else fitz.csRGB
+    with document_sessions.session(pdf_source, content_hash) as session:
+        total_pages = session.page_count
+        if page_numbers is None:
+            pages_to_process = range(total_pages)
+        else:
+            pages_to_process = [
+                p - 1 for p in page_numbers if 1 <= p <= total_pages
+            ]  # Convert to 0-based
+
+        for page_idx in pages_to_process:
+            # The lock is only held while rendering, not while the caller has the page
+            with session.lock:
+                pixmap = session.document[page_idx].get_pixmap(
+                    matrix=fitz.Matrix(zoom, zoom), colorspace=colorspace, alpha=False
+                )
+            yield pixmap_to_array(pixmap)
 
 
 def convert_pdf_to_images(
-    pdf_stream: bytes, page_numbers: Optional[List[int]] = None
+    pdf_stream: Union[bytes, str],
+    page_numbers: Optional[List[int]] = None,
+    grayscale: bool = False,
+    content_hash: Optional[str] = None,
 ) -> List[np.ndarray]:
     """
     Convert PDF pages to images
 
+    Holds every page in memory; prefer iter_pdf_images for large documents.
+
     Args:
-        pdf_stream: PDF file content as bytes
+        pdf_stream: PDF file content as bytes, or path to the PDF file
         page_numbers: List of page numbers to convert (1-based). If None, convert all pages.
+        grayscale: Render in grayscale (one channel) instead of RGB
+        content_hash: sha256 of the PDF if already known (skips hashing)
 
     Returns:
         List of images as numpy arrays
     """
-    images = []
+    return list(
+        iter_pdf_images(
+            pdf_stream, page_numbers, grayscale=grayscale, content_hash=content_hash
+        )
+    )
 
-    # Open PDF
-    pdf_document = fitz.open(stream=io.BytesIO(pdf_stream), filetype="pdf")
-    total_pages = len(pdf_document)
 
-    # Determine which pages to process
-    if page_numbers is None:
-        pages_to_process = range(total_pages)
-    else:
-        pages_to_process = [
-            p - 1 for p in page_numbers if 1 <= p <= total_pages
-        ]  # Convert to 0-based
+def extract_text_from_pdf(
+    pdf_stream: Union[bytes, str], content_hash: Optional[str] = None
+) -> str:
+    """
+    Extract text directly from PDF (without OCR)
 
-    for page_idx in pages_to_process:
-        page = pdf_document[page_idx]
+    Args:
+        pdf_stream: PDF file content as bytes, or path to the PDF file
+        content_hash: sha256 of the PDF if already known (skips hashing)
+
+    Returns:
+        Extracted text as string
+    """
+    text = []
 
-        # Convert page to image with high resolution
-        mat = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # 2x zoom for better quality
-        img_data = mat.tobytes("png")
+    with document_sessions.session(pdf_stream, content_hash) as session:
+        for page_num in range(session.page_count):
+            page_text = session.page_text(page_num)
+            text.append(f"--- Page {page_num + 1} ---")
+            text.append(page_text)
+            text.append("")
 
-        # Convert to PIL Image and then to numpy array
-        img = Image.open(io.BytesIO(img_data))
-        img_array = np.array(img)
+    return "\n".join(text)
 
-        images.append(img_array)
 
-    pdf_document.close()
-    return images
+def get_pdf_page_count(
+    pdf_stream: Union[bytes, str], content_hash: Optional[str] = None
+) -> int:
+    """
+    Get the number of pages in a PDF
 
+    Args:
+        pdf_stream: PDF file content as bytes, or path to the PDF file
+        content_hash: sha256 of the PDF if already known (skips hashing)
 
-def extract_text_from_pdf(pdf_stream: bytes) -> str:
+    Returns:
+        Number of pages
     """
-    Extract text directly from PDF (without OCR)
+    with document_sessions.session(pdf_stream, content_hash) as session:
+        return session.page_count
+
+
+def get_pdf_page_sizes(
+    pdf_stream: Union[bytes, str], content_hash: Optional[str] = None
+) -> List[Tuple[float, float]]:
+    """
+    Get the size of every page in a PDF
 
     Args:
-        pdf_stream: PDF file content as bytes
+        pdf_stream: PDF file content as bytes, or path to the PDF file
+        content_hash: sha256 of the PDF if already known (skips hashing)
 
     Returns:
-        Extracted text as string
+        (width, height) in PDF points (1/72 inch), in page order
     """
-    text = []
+    with document_sessions.session(pdf_stream, content_hash) as session:
+        return session.page_sizes
 
-    pdf_document = fitz.open(stream=io.BytesIO(pdf_stream), filetype="pdf")
 
-    for page_num in range(len(pdf_document)):
-        page = pdf_document[page_num]
-        page_text = page.get_text()
-        text.append(f"--- Page {page_num + 1} ---")
-        text.append(page_text)
-        text.append("")
+def classify_page(page: fitz.Page) -> Dict[str, Any]:
+    """
+    Decide whether a page is vector (real text and geometry) or raster (scanned).
 
-    pdf_document.close()
-    return "\n".join(text)
+    Only cheap counts are used: visible text spans from the text trace, drawing
+    operations from the C-level drawing list and the share of the page covered
+    by images. Invisible text (an OCR layer over a scan) is not counted.
 
+    Args:
+        page: PyMuPDF page
 
-def get_pdf_page_count(pdf_stream: bytes) -> int:
+    Returns:
+        dict with page_type ("vector" or "raster") and the counts behind it
     """
-    Get the number of pages in a PDF
+    start = time.time()
+    page_area = abs(page.rect) or 1.0
+
+    text_spans = sum(
+        1 for span in page.get_texttrace() if span["type"] != INVISIBLE_TEXT
+    )
+    drawing_ops = len(page.get_cdrawings())
+
+    image_area = 0.0
+    for image in page.get_image_info():
+        bbox = fitz.Rect(image["bbox"]) & page.rect
+        if not bbox.is_empty:
+            image_area += abs(bbox)
+    image_coverage = min(1.0, image_area / page_area)
+
+    if image_coverage >= SCANNED_IMAGE_COVERAGE:
+        page_type = "raster"
+    elif text_spans + drawing_ops >= MIN_VECTOR_CONTENT:
+        page_type = "vector"
+    else:
+        # Blank or image-only fragments, let OCR have a look
+        page_type = "raster"
+
+    return {
+        "page_type": page_type,
+        "text_spans": text_spans,
+        "drawing_ops": drawing_ops,
+        "image_coverage": round(image_coverage, 4),
+        "classify_seconds": time.time() - start,
+    }
+
+
+def classify_pdf_pages(
+    pdf_source: Union[bytes, str],
+    page_numbers: Optional[List[int]] = None,
+    content_hash: Optional[str] = None,
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Classify PDF pages as vector or raster
 
     Args:
-        pdf_stream: PDF file content as bytes
+        pdf_source: PDF file content as bytes, or path to the PDF file
+        page_numbers: List of page numbers to classify (1-based). If None, classify all pages.
+        content_hash: sha256 of the PDF if already known (skips hashing)
 
     Returns:
-        Number of pages
+        Classification per 1-based page number
+    """
+    with document_sessions.session(pdf_source, content_hash) as session:
+        total_pages = session.page_count
+
+        if page_numbers is None:
+            page_numbers = range(1, total_pages + 1)
+
+        with session.lock:
+            classifications = {
+                p: classify_page(session.document[p - 1])
+                for p in page_numbers
+                if 1 <= p <= total_pages
+            }
+
+    return classifications
+
+
+def extract_vector_page(page: fitz.Page) -> Dict[str, Any]:
+    """
+    Extract text spans and drawing geometry straight from the page content stream
+
+    Args:
+        page: PyMuPDF page
+
+    Returns:
+        dict with page size, text spans (text, bbox, font size) and drawings
+        (items as point lists, stroke/fill info)
+    """
+    texts = []
+    for block in page.get_text("dict")["blocks"]:
+        for line in block.get("lines", []):
+            for span in line["spans"]:
+                if not span["text"].strip():
+                    continue
+                texts.append(
+                    {
+                        "text": span["text"],
+                        "bbox": [round(v, 2) for v in span["bbox"]],
+                        "font_size": round(span["size"], 2),
+                        "font": span["font"],
+                        "dir": [round(v, 4) for v in line["dir"]],
+                    }
+                )
+
+    drawings = []
+    for drawing in page.get_drawings():
+        items = []
+        for item in drawing["items"]:
+            kind = item[0]
+            if kind == "re":
+                rect = item[1]
+                points = [[rect.x0, rect.y0], [rect.x1, rect.y1]]
+            elif kind == "qu":
+                points = [[p.x, p.y] for p in item[1]]
+            else:
+                points = [[p.x, p.y] for p in item[1:] if isinstance(p, fitz.Point)]
+            items.append([kind, [[round(x, 2), round(y, 2)] for x, y in points]])
+        drawings.append(
+            {
+                "type": drawing["type"],
+                "width": drawing.get("width"),
+                "close_path": drawing.get("closePath", False),
+                "items": items,
+            }
+        )
+
+    return {
+        "width": page.rect.width,
+        "height": page.rect.height,
+        "texts": texts,
+        "drawings": drawings,
+    }
+
+
+def extract_page_spans(page: fitz.Page) -> Dict[str, Any]:
+    """
+    Extract the text spans of a page as compact per-page arrays
+
+    One entry per span at the same index in every array, in reading order.
+    bbox is [x, y, width, height] and origin the baseline start, both in PDF
+    points with the origin top-left (same layout as TextElement). rotation is
+    the writing direction in degrees counter-clockwise, 0 for normal text.
+
+    Args:
+        page: PyMuPDF page
+
+    Returns:
+        dict with page_number, width, height and the span arrays
     """
-    pdf_document = fitz.open(stream=io.BytesIO(pdf_stream), filetype="pdf")
-    page_count = len(pdf_document)
-    pdf_document.close()
-    return page_count
+    spans = {
+        "text": [],
+        "bbox": [],
+        "origin": [],
+        "font_size": [],
+        "rotation": [],
+        "font": [],
+    }
+    for block in page.get_text("dict", sort=True)["blocks"]:
+        for line in block.get("lines", []):
+            dx, dy = line["dir"]
+            rotation = round(math.degrees(math.atan2(-dy, dx)), 2) % 360
+            for span in line["spans"]:
+                if not span["text"].strip():
+                    continue
+                x0, y0, x1, y1 = span["bbox"]
+                spans["text"].append(span["text"])
+                spans["bbox"].append(
+                    [round(x0, 2), round(y0, 2), round(x1 - x0, 2), round(y1 - y0, 2)]
+                )
+                spans["origin"].append([round(v, 2) for v in span["origin"]])
+                spans["font_size"].append(round(span["size"], 2))
+                spans["rotation"].append(rotation)
+                spans["font"].append(span["font"])
+
+    return {
+        "page_number": page.number + 1,
+        "width": page.rect.width,
+        "height": page.rect.height,
+        **spans,
+    }
 
 
 def preprocess_image_for_ocr(image: np.ndarray) -> np.ndarray:
@@ -1,3 +1,6 @@
+import os
+import sys
+
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
@@ -6,6 +9,17 @@ from neo4j import GraphDatabase
 import requests
 import json
 
+# Add backend to sys.path so the shared 'apps.common' package is importable,
+# and this service's own directory so 'routes' resolves when main is imported
+# as services.VectorizerService.main (tests/tests.py)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "..", ".."))
+for path in (BACKEND_DIR, BASE_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from routes.routes import router
+
 OLLAMA_URL = "http://localhost:11434/api/generate"
 OLLAMA_MODEL = "llava"
 NEO4J_URI = "bolt://localhost:7687"
@@ -26,6 +40,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.include_router(router, prefix="/api/v1")
+
 # ------------------------------------
 # PROMPT TEMPLATE
 # ------------------------------------
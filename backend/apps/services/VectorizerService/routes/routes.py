@@ -1,7 +1,9 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from apps.common.uploads import spool_upload
 from services.vectorizer import VectorizerService
-import os
-import tempfile
+from models.models import VectorizedPDFResponse
 
 router = APIRouter()
 vectorizer_service = VectorizerService()
@@ -12,22 +14,45 @@ async def vectorize_images(files: list[UploadFile] = File(...)):
     """
     Accepts multiple image files, runs OCR and layout grouping, and returns JSON results.
     """
-    temp_paths = []
+    uploads = []
     try:
         for file in files:
-            suffix = os.path.splitext(file.filename)[-1]
-            with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-                tmp.write(await file.read())
-                temp_paths.append(tmp.name)
-        result = vectorizer_service.vectorize_images(temp_paths)
+            uploads.append(await spool_upload(file))
+        result = await run_in_threadpool(
+            vectorizer_service.vectorize_images, [u.path for u in uploads]
+        )
         return result
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Image vectorization failed: {str(e)}"
         )
     finally:
-        for path in temp_paths:
-            try:
-                os.remove(path)
-            except Exception:
-                pass
+        for upload in uploads:
+            upload.close()
+
+
+@router.post("/vectorize-pdf", response_model=VectorizedPDFResponse)
+async def vectorize_pdf(
+    file: UploadFile = File(...),
+    compact: bool = Form(False),
+    hatches: bool = Form(False),
+):
+    """
+    Accepts a PDF and extracts text, lines, paths and scale directly from its
+    vector content, without rasterizing.
+
+    compact merges collinear pieces and drops fragments; hatches (with
+    compact) also collapses hatch patterns into regions. Both are lossy and
+    off by default.
+    """
+    if not file.filename.lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="File must be a PDF")
+    upload = await spool_upload(file)
+    try:
+        return await run_in_threadpool(
+            vectorizer_service.vectorize_pdf, upload.path, compact, hatches
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"PDF vectorization failed: {str(e)}")
+    finally:
+        upload.close()
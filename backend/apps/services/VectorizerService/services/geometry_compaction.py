@@ -0,0 +1,276 @@
+import math
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+Segment = Tuple[float, float, float, float]  # x0, y0, x1, y1
+Path = Tuple[List[Tuple[float, float]], bool]  # points, closed
+
+# Defaults, in PDF points (1/72 inch) unless noted
+ANGLE_TOLERANCE = math.radians(0.5)  # lines within this angle can merge
+OFFSET_TOLERANCE = 0.25  # max distance between collinear lines
+GAP_TOLERANCE = 1.0  # max gap bridged when merging collinear pieces
+MIN_SEGMENT_LENGTH = 0.5  # shorter segments are dropped
+MIN_PATH_SIZE = 1.0  # paths whose bbox fits in this square are dropped
+HATCH_MIN_LINES = 12  # parallel lines needed to call something a hatch
+HATCH_MAX_SPACING = 12.0  # max distance between neighbouring hatch lines
+HATCH_MAX_LENGTH = 72.0  # longer lines are treated as real geometry
+HATCH_ANGLE_BUCKET = math.radians(1.0)
+
+
+def _line_params(x0: float, y0: float, x1: float, y1: float):
+    """
+    Normal form of a segment: direction angle in [-tol/2, pi - tol/2), signed
+    offset of the infinite line from the origin and the segment's extent along
+    the direction.
+    """
+    theta = math.atan2(y1 - y0, x1 - x0) % math.pi
+    if theta >= math.pi - ANGLE_TOLERANCE / 2:
+        theta -= math.pi
+    ux, uy = math.cos(theta), math.sin(theta)
+    rho = -uy * x0 + ux * y0
+    t0 = ux * x0 + uy * y0
+    t1 = ux * x1 + uy * y1
+    return theta, rho, min(t0, t1), max(t0, t1)
+
+
+def _segment_between(start: Tuple[float, float], end: Tuple[float, float]) -> Segment:
+    return (
+        round(start[0], 3),
+        round(start[1], 3),
+        round(end[0], 3),
+        round(end[1], 3),
+    )
+
+
+def _bucket_neighbours(key: Tuple[int, int], angle_buckets: int):
+    """
+    The key itself and the eight keys around it. Angles wrap at pi, where
+    the direction flips and with it the sign of the offset.
+    """
+    theta_key, rho_key = key
+    for d_theta in (-1, 0, 1):
+        neighbour_theta = theta_key + d_theta
+        sign = 1
+        if not 0 <= neighbour_theta < angle_buckets:
+            neighbour_theta %= angle_buckets
+            sign = -1
+        for d_rho in (-1, 0, 1):
+            yield (neighbour_theta, sign * rho_key + d_rho), sign
+
+
+def merge_collinear(
+    lines: List[Segment],
+    gap_tolerance: float = GAP_TOLERANCE,
+    min_length: float = MIN_SEGMENT_LENGTH,
+) -> List[Segment]:
+    """
+    Merge collinear, overlapping or nearly touching segments.
+
+    Segments are hashed on (angle, offset) of their infinite line. A bucket
+    is joined with each neighbouring bucket whose mean line is within
+    tolerance, so lines that straddle a rounding boundary still merge. Within
+    a group the segments are projected on the longest one, sorted and merged
+    like intervals, and each merged run keeps the actual endpoints at its two
+    ends. Anything still shorter than min_length afterwards is dropped.
+    """
+    angle_buckets = round(math.pi / ANGLE_TOLERANCE)
+    buckets: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+    params = []
+    for x0, y0, x1, y1 in lines:
+        if x0 == x1 and y0 == y1:
+            continue
+        theta, rho, _, _ = _line_params(x0, y0, x1, y1)
+        key = (
+            round(theta / ANGLE_TOLERANCE) % angle_buckets,
+            round(rho / OFFSET_TOLERANCE),
+        )
+        buckets[key].append(len(params))
+        params.append((theta, rho, (x0, y0, x1, y1)))
+
+    means = {
+        key: (
+            sum(params[i][0] for i in members) / len(members),
+            sum(params[i][1] for i in members) / len(members),
+        )
+        for key, members in buckets.items()
+    }
+    parent = {key: key for key in buckets}
+
+    def find(key):
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    for key, (theta, rho) in means.items():
+        for neighbour, sign in _bucket_neighbours(key, angle_buckets):
+            if neighbour == key or neighbour not in means:
+                continue
+            other_theta, other_rho = means[neighbour]
+            d_theta = abs(theta - other_theta)
+            d_theta = min(d_theta, math.pi - d_theta)
+            d_rho = abs(rho - sign * other_rho)
+            if d_theta <= ANGLE_TOLERANCE and d_rho <= OFFSET_TOLERANCE:
+                parent[find(neighbour)] = find(key)
+
+    groups: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+    for key, members in buckets.items():
+        groups[find(key)].extend(members)
+
+    merged: List[Segment] = []
+    for members in groups.values():
+        x0, y0, x1, y1 = max(
+            (params[i][2] for i in members),
+            key=lambda s: math.hypot(s[2] - s[0], s[3] - s[1]),
+        )
+        length = math.hypot(x1 - x0, y1 - y0)
+        ux, uy = (x1 - x0) / length, (y1 - y0) / length
+
+        pieces = []
+        for i in members:
+            ax, ay, bx, by = params[i][2]
+            ta, tb = ux * ax + uy * ay, ux * bx + uy * by
+            if ta > tb:
+                ta, tb, ax, ay, bx, by = tb, ta, bx, by, ax, ay
+            pieces.append((ta, tb, (ax, ay), (bx, by)))
+        pieces.sort()
+
+        start, end, start_point, end_point = pieces[0]
+        for t0, t1, p0, p1 in pieces[1:]:
+            if t0 <= end + gap_tolerance:
+                if t1 > end:
+                    end, end_point = t1, p1
+                continue
+            if end - start >= min_length:
+                merged.append(_segment_between(start_point, end_point))
+            start, end, start_point, end_point = t0, t1, p0, p1
+        if end - start >= min_length:
+            merged.append(_segment_between(start_point, end_point))
+    return merged
+
+
+def drop_micro_paths(paths: List[Path], min_size: float = MIN_PATH_SIZE) -> List[Path]:
+    kept = []
+    for points, closed in paths:
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        if max(xs) - min(xs) >= min_size or max(ys) - min(ys) >= min_size:
+            kept.append((points, closed))
+    return kept
+
+
+def collapse_hatches(
+    lines: List[Segment],
+    min_lines: int = HATCH_MIN_LINES,
+    max_spacing: float = HATCH_MAX_SPACING,
+    max_length: float = HATCH_MAX_LENGTH,
+) -> Tuple[List[Segment], List[Dict]]:
+    """
+    Replace families of short, parallel, side-by-side lines with one region.
+
+    Short lines are grouped by angle; within a group, lines whose offsets are
+    within max_spacing and whose extents overlap are joined (union-find),
+    looking only at nearby cells of a grid. Groups of at least min_lines
+    become a hatch region. Real repeated geometry, e.g. stair treads, can
+    look the same, so compact_geometry only does this when asked to.
+
+    Returns:
+        (remaining lines, hatch regions as dicts with bbox, angle, spacing and
+        line_count)
+    """
+    kept: List[Segment] = []
+    by_angle: Dict[int, List[Tuple[float, float, float, Segment]]] = defaultdict(list)
+    for segment in lines:
+        if math.hypot(segment[2] - segment[0], segment[3] - segment[1]) > max_length:
+            kept.append(segment)
+            continue
+        theta, rho, t0, t1 = _line_params(*segment)
+        by_angle[round(theta / HATCH_ANGLE_BUCKET)].append((rho, t0, t1, segment))
+
+    hatches = []
+    for angle_bucket, group in by_angle.items():
+        if len(group) < min_lines:
+            kept.extend(item[3] for item in group)
+            continue
+
+        parent = list(range(len(group)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        # Grid on (offset, start along the line). Lines are at most max_length
+        # long, so a line overlapping another starts at most max_length before
+        # it and only a few cells around each line need checking
+        grid: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        for i, (rho, t0, _, _) in enumerate(group):
+            grid[(math.floor(rho / max_spacing), math.floor(t0 / max_length))].append(i)
+
+        for i, (rho_i, t0_i, t1_i, _) in enumerate(group):
+            rho_cell = math.floor(rho_i / max_spacing)
+            first_cell = math.floor((t0_i - max_length) / max_length)
+            last_cell = math.floor(t1_i / max_length)
+            for d_rho in (-1, 0, 1):
+                for t_cell in range(first_cell, last_cell + 1):
+                    for j in grid.get((rho_cell + d_rho, t_cell), ()):
+                        if j <= i:
+                            continue
+                        rho_j, t0_j, t1_j, _ = group[j]
+                        if (
+                            abs(rho_j - rho_i) <= max_spacing
+                            and t0_j <= t1_i
+                            and t0_i <= t1_j
+                        ):
+                            parent[find(j)] = find(i)
+
+        components: Dict[int, List[int]] = defaultdict(list)
+        for i in range(len(group)):
+            components[find(i)].append(i)
+
+        for members in components.values():
+            if len(members) < min_lines:
+                kept.extend(group[i][3] for i in members)
+                continue
+            xs = [c for i in members for c in (group[i][3][0], group[i][3][2])]
+            ys = [c for i in members for c in (group[i][3][1], group[i][3][3])]
+            offsets = sorted(group[i][0] for i in members)
+            gaps = sorted(b - a for a, b in zip(offsets, offsets[1:]))
+            hatches.append(
+                {
+                    "bbox": [min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys)],
+                    "angle": round(math.degrees(angle_bucket * HATCH_ANGLE_BUCKET), 2),
+                    "spacing": round(gaps[len(gaps) // 2], 3) if gaps else 0.0,
+                    "line_count": len(members),
+                }
+            )
+    return kept, hatches
+
+
+def compact_geometry(
+    lines: List[Segment], paths: List[Path], hatches: bool = False
+) -> Tuple[List[Segment], List[Path], List[Dict], Dict[str, int]]:
+    """
+    Shrink a page's geometry: merge collinear pieces and drop fragments and
+    micro-paths. With hatches=True hatch patterns are also collapsed into
+    regions.
+
+    Returns:
+        (lines, paths, hatch regions, before/after counts)
+    """
+    merged = merge_collinear(lines)
+    if hatches:
+        kept_lines, hatch_regions = collapse_hatches(merged)
+    else:
+        kept_lines, hatch_regions = merged, []
+    kept_paths = drop_micro_paths(paths)
+    stats = {
+        "lines_before": len(lines),
+        "lines_after": len(kept_lines),
+        "paths_before": len(paths),
+        "paths_after": len(kept_paths),
+        "hatch_regions": len(hatch_regions),
+        "hatch_lines": sum(h["line_count"] for h in hatch_regions),
+    }
+    return kept_lines, kept_paths, hatch_regions, stats
@@ -0,0 +1,230 @@
+import math
+import re
+from fractions import Fraction
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+import fitz  # PyMuPDF
+
+from .geometry_compaction import compact_geometry
+
+# Segments used to flatten a cubic bezier into path points
+BEZIER_STEPS = 8
+
+_NTS = re.compile(r"\bN\.?\s?T\.?\s?S\.?(?![A-Z])|NOT\s+TO\s+SCALE", re.IGNORECASE)
+_IMPERIAL_SCALE = re.compile(
+    r"(\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?)\s*(?:\"|''|”|in\.?)\s*=\s*"
+    r"(\d+)\s*(?:'|’|ft\.?)\s*(?:-?\s*(\d+/\d+|\d+(?:\.\d+)?)\s*(?:\"|”)?)?"
+)
+_METRIC_SCALE = re.compile(r"\b1\s*:\s*(\d+(?:\.\d+)?)\b")
+
+# Document opened once per worker process by the pool initializer
+_worker_document = None
+
+
+def open_pdf(pdf_source: Union[bytes, str]) -> fitz.Document:
+    """
+    Open a PDF from its content or, for spooled uploads, from its path.
+    """
+    if isinstance(pdf_source, str):
+        return fitz.open(pdf_source, filetype="pdf")
+    return fitz.open(stream=pdf_source, filetype="pdf")
+
+
+def init_worker(pdf_source: Union[bytes, str]) -> None:
+    global _worker_document
+    _worker_document = open_pdf(pdf_source)
+
+
+def _parse_inches(value: str) -> float:
+    return float(sum(Fraction(part) for part in value.split()))
+
+
+def infer_scale(page_text: str) -> Dict[str, Any]:
+    """
+    Find the drawing scale in a page's text (title block or view labels).
+
+    ratio is real length per paper length, e.g. 1/4" = 1'-0" gives 48 and
+    1:100 gives 100.
+
+    Returns:
+        dict with units ("imperial", "metric" or None), ratio and nts
+    """
+    match = _IMPERIAL_SCALE.search(page_text)
+    if match:
+        paper_inches = _parse_inches(match.group(1))
+        real_inches = int(match.group(2)) * 12
+        if match.group(3):
+            real_inches += _parse_inches(match.group(3))
+        if paper_inches > 0:
+            return {
+                "units": "imperial",
+                "ratio": round(real_inches / paper_inches, 4),
+                "nts": False,
+            }
+
+    match = _METRIC_SCALE.search(page_text)
+    if match:
+        return {"units": "metric", "ratio": float(match.group(1)), "nts": False}
+
+    return {"units": None, "ratio": None, "nts": bool(_NTS.search(page_text))}
+
+
+def _bezier_points(p1, p2, p3, p4) -> List[Tuple[float, float]]:
+    points = []
+    for step in range(1, BEZIER_STEPS + 1):
+        t = step / BEZIER_STEPS
+        u = 1 - t
+        points.append(
+            (
+                u**3 * p1.x + 3 * u * u * t * p2.x + 3 * u * t * t * p3.x + t**3 * p4.x,
+                u**3 * p1.y + 3 * u * u * t * p2.y + 3 * u * t * t * p3.y + t**3 * p4.y,
+            )
+        )
+    return points
+
+
+def extract_page(
+    page: fitz.Page, compact: bool = False, hatches: bool = False
+) -> Dict[str, Any]:
+    """
+    Extract text spans, straight lines and paths from one page's content stream.
+
+    A drawing is split into subpaths wherever an item does not start at the
+    previous item's end point. Closed subpaths, and subpaths with curves,
+    become a path so that room outlines are kept as polygons; rectangles and
+    quads are paths of their own. The straight segments of open subpaths
+    become lines. Coordinates are PDF points, origin top-left.
+    With compact=True the geometry goes through compact_geometry, which also
+    collapses hatch patterns when hatches=True.
+
+    Returns:
+        dict of plain tuples (cheap to send between processes)
+    """
+    texts = []
+    for block in page.get_text("dict")["blocks"]:
+        for line in block.get("lines", []):
+            for span in line["spans"]:
+                text = span["text"].strip()
+                if not text:
+                    continue
+                x0, y0, x1, y1 = span["bbox"]
+                texts.append(
+                    (
+                        text,
+                        span["origin"][0],
+                        span["origin"][1],
+                        span["size"],
+                        x0,
+                        y0,
+                        x1 - x0,
+                        y1 - y0,
+                    )
+                )
+
+    lines = []
+    paths = []
+    for drawing in page.get_drawings():
+        # Subpaths as [points, segments, has_shape]; a new one starts whenever
+        # an item does not continue from where the previous one ended
+        subpaths: List[list] = []
+        for item in drawing["items"]:
+            kind = item[0]
+            if kind in ("l", "c"):
+                start = (item[1].x, item[1].y)
+                if not subpaths or subpaths[-1][0][-1] != start:
+                    subpaths.append([[start], [], False])
+                points, segments, _ = subpaths[-1]
+                if kind == "l":
+                    end = (item[2].x, item[2].y)
+                    segments.append((start[0], start[1], end[0], end[1]))
+                    points.append(end)
+                else:
+                    subpaths[-1][2] = True
+                    points.extend(_bezier_points(*item[1:5]))
+            elif kind == "re":
+                rect = item[1]
+                paths.append(
+                    (
+                        [
+                            (rect.x0, rect.y0),
+                            (rect.x1, rect.y0),
+                            (rect.x1, rect.y1),
+                            (rect.x0, rect.y1),
+                        ],
+                        True,
+                    )
+                )
+            elif kind == "qu":
+                quad = item[1]
+                paths.append(
+                    (
+                        [
+                            (quad.ul.x, quad.ul.y),
+                            (quad.ur.x, quad.ur.y),
+                            (quad.lr.x, quad.lr.y),
+                            (quad.ll.x, quad.ll.y),
+                        ],
+                        True,
+                    )
+                )
+
+        for index, (points, segments, has_curve) in enumerate(subpaths):
+            # closePath belongs to the drawing's last subpath
+            closed = (len(points) > 2 and points[0] == points[-1]) or (
+                index == len(subpaths) - 1 and bool(drawing.get("closePath"))
+            )
+            if len(points) > 2 and (closed or has_curve):
+                paths.append((points, closed))
+            if not (closed and len(points) > 2):
+                # Segments of a closed outline are already in its path
+                lines.extend(segments)
+
+    has_vector_content = bool(texts or lines or paths)
+    hatch_regions: List[Dict] = []
+    compaction = None
+    if compact:
+        lines, paths, hatch_regions, compaction = compact_geometry(
+            lines, paths, hatches
+        )
+
+    page_text = " ".join(t[0] for t in texts)
+    return {
+        "page": page.number + 1,
+        "texts": texts,
+        "lines": lines,
+        "paths": paths,
+        "hatches": hatch_regions,
+        "compaction": compaction,
+        "scale": infer_scale(page_text),
+        "has_vector_content": has_vector_content,
+    }
+
+
+def extract_pages(
+    document: fitz.Document,
+    page_indices: Sequence[int],
+    compact: bool = False,
+    hatches: bool = False,
+) -> List[Dict]:
+    return [extract_page(document[idx], compact, hatches) for idx in page_indices]
+
+
+def extract_pages_in_worker(
+    page_indices: Sequence[int], compact: bool = False, hatches: bool = False
+) -> List[Dict]:
+    return extract_pages(_worker_document, page_indices, compact, hatches)
+
+
+def line_length(x0: float, y0: float, x1: float, y1: float) -> float:
+    return math.hypot(x1 - x0, y1 - y0)
+
+
+def page_ranges(page_count: int, workers: int) -> List[List[int]]:
+    """
+    Contiguous page ranges, a few per worker to even out slow sheets.
+    """
+    chunk_size = max(1, math.ceil(page_count / (workers * 4)))
+    return [
+        list(range(start, min(start + chunk_size, page_count)))
+        for start in range(0, page_count, chunk_size)
+    ]
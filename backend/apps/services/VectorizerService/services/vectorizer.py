@@ -1,12 +1,70 @@
+import os
+import sys
+import tempfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional, Union
+
+import fitz  # PyMuPDF
 import pytesseract
 from PIL import Image
 
+# Add backend to sys.path so the shared 'apps.common' package is importable
+BACKEND_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "..")
+)
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from apps.common.ocr_cache import OcrCache, cache_key, image_hash
+from models.models import (
+    HatchRegion,
+    Line,
+    PageScaleInfo,
+    PathElement,
+    ScaleInfo,
+    TextElement,
+    VectorizedPDFResponse,
+)
+from .vector_extraction import (
+    extract_pages,
+    init_worker,
+    extract_pages_in_worker,
+    line_length,
+    open_pdf,
+    page_ranges,
+)
+
+# dpi used to rasterize pages without vector content for the OCR fallback
+FALLBACK_DPI = 300
+
 
 class VectorizerService:
+    def __init__(
+        self, max_workers: Optional[int] = None, ocr_cache: Optional[OcrCache] = None
+    ):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # Shared with OcrService through the on-disk OCR cache
+        self.ocr_cache = ocr_cache or OcrCache()
+
     def ocr_image(self, image_path: str) -> dict:
         """
         Run Tesseract OCR on an image and return word-level results with bounding boxes.
+        Results are cached by image content, so re-runs skip OCR.
         """
+        key = cache_key(
+            image_hash(image_path),
+            output="VectorizerService.words",
+            engine="pytesseract",
+            config="",
+            preprocess=None,
+            min_confidence=None,
+        )
+        cached = self.ocr_cache.get(key)
+        if cached is not None:
+            return cached
+
         img = Image.open(image_path)
         ocr_data = pytesseract.image_to_data(img, output_type=pytesseract.Output.DICT)
         words = []
@@ -26,7 +84,9 @@ class VectorizerService:
                 "par_num": ocr_data["par_num"][i],
             }
             words.append(word)
-        return {"words": words}
+        result = {"words": words}
+        self.ocr_cache.put(key, result)
+        return result
 
     def group_words_by_line(self, words: list) -> list:
         """
@@ -81,3 +141,147 @@ class VectorizerService:
                 }
             )
         return {"pages": results}
+
+    def vectorize_pdf(
+        self,
+        pdf_source: Union[bytes, str],
+        compact: bool = False,
+        hatches: bool = False,
+    ) -> VectorizedPDFResponse:
+        """
+        Extract text, lines, paths and scale straight from the PDF content stream.
+
+        With compact=True each page's geometry is compacted: collinear pieces
+        are merged and fragments and micro-paths dropped. hatches=True also
+        collapses hatch patterns into hatch regions, which can swallow real
+        repeated geometry such as stair treads. Both are off by default since
+        the output is lossy. Before/after counts are in `compaction`.
+
+        Pages are extracted in parallel across a process pool, each worker
+        opening the document once. Pages without any vector content (scans)
+        fall back to OCR on a rendered image and set fallback=True.
+        Coordinates are PDF points with the origin at the top-left.
+
+        pdf_source is the PDF content or a path to it; with a path each
+        worker opens the file itself instead of receiving a pickled copy.
+        """
+        document = open_pdf(pdf_source)
+        page_count = len(document)
+
+        workers = min(self.max_workers, page_count)
+        if workers <= 1:
+            pages = extract_pages(document, range(page_count), compact, hatches)
+        else:
+            pages = []
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=init_worker,
+                initargs=(pdf_source,),
+            ) as pool:
+                for chunk in pool.map(
+                    partial(extract_pages_in_worker, compact=compact, hatches=hatches),
+                    page_ranges(page_count, workers),
+                ):
+                    pages.extend(chunk)
+
+        lines: List[Line] = []
+        texts: List[TextElement] = []
+        paths: List[PathElement] = []
+        scales: List[PageScaleInfo] = []
+        hatch_regions: List[HatchRegion] = []
+        compaction: Dict[str, int] = defaultdict(int)
+        fallback = False
+
+        for page in pages:
+            if not page["has_vector_content"]:
+                fallback = True
+                texts.extend(self._ocr_pdf_page(document[page["page"] - 1]))
+
+            for x0, y0, x1, y1 in page["lines"]:
+                lines.append(
+                    Line(
+                        start=[x0, y0],
+                        end=[x1, y1],
+                        length=line_length(x0, y0, x1, y1),
+                        page=page["page"],
+                    )
+                )
+            for text, ox, oy, size, x, y, w, h in page["texts"]:
+                texts.append(
+                    TextElement(
+                        text=text,
+                        position=[ox, oy],
+                        font_size=size,
+                        bbox=[x, y, w, h],
+                        page=page["page"],
+                    )
+                )
+            for points, closed in page["paths"]:
+                paths.append(
+                    PathElement(
+                        points=[list(pt) for pt in points],
+                        closed=closed,
+                        page=page["page"],
+                    )
+                )
+
+            for hatch in page["hatches"]:
+                hatch_regions.append(HatchRegion(**hatch, page=page["page"]))
+            for key, count in (page["compaction"] or {}).items():
+                compaction[key] += count
+
+            scale = page["scale"]
+            scales.append(
+                PageScaleInfo(
+                    page=page["page"],
+                    scale=(
+                        ScaleInfo(units=scale["units"], ratio=scale["ratio"])
+                        if scale["ratio"] is not None
+                        else None
+                    ),
+                    nts=scale["nts"],
+                )
+            )
+
+        document.close()
+        return VectorizedPDFResponse(
+            lines=lines,
+            texts=texts,
+            paths=paths,
+            scales=scales,
+            fallback=fallback,
+            hatches=hatch_regions,
+            compaction=dict(compaction) if compact else None,
+        )
+
+    def _ocr_pdf_page(self, page: fitz.Page) -> List[TextElement]:
+        """
+        OCR fallback for pages without vector content. Word boxes are mapped
+        back to PDF points so they line up with extracted vector text.
+        """
+        zoom = FALLBACK_DPI / 72
+        pixmap = page.get_pixmap(dpi=FALLBACK_DPI)
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp:
+            tmp_path = tmp.name
+        try:
+            pixmap.save(tmp_path)
+            words = self.ocr_image(tmp_path)["words"]
+        finally:
+            os.remove(tmp_path)
+
+        texts = []
+        for word in words:
+            x = word["left"] / zoom
+            y = word["top"] / zoom
+            w = word["width"] / zoom
+            h = word["height"] / zoom
+            texts.append(
+                TextElement(
+                    text=word["text"],
+                    position=[x, y + h],
+                    font_size=h,
+                    bbox=[x, y, w, h],
+                    page=page.number + 1,
+                )
+            )
+        return texts